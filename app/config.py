@@ -3,19 +3,79 @@ Configuration Management - Handles configuration and environment setup
 """
 
 import os
-import json
+import hashlib
 import logging
 from typing import Any, Dict, Optional
-from pathlib import Path
+from jsonschema import Draft202012Validator
+
+try:
+    import orjson
+except ImportError:  # Fall back to stdlib json when orjson is unavailable
+    orjson = None
+    import json
 
 logger = logging.getLogger(__name__)
 
+# Environment variable -> (config key, type) mapping applied by Config._load_env_vars
+ENV_MAP = (
+    ('OPENAI_API_KEY', 'openai_api_key', str),
+    ('DEVICE_IP', 'device_ip', str),
+    ('DEVICE_PORT', 'device_port', int),
+    ('BOT_DELAY', 'bot_delay', int),
+    ('LOG_LEVEL', 'log_level', str),
+)
+
+_NUMBER_OR_NULL = {'type': ['number', 'null']}
+
+# Structural rules for the configuration, checked by Config.validate
+CONFIG_SCHEMA = {
+    'type': 'object',
+    'required': ['openai_api_key'],
+    'properties': {
+        'openai_api_key': {'type': 'string', 'minLength': 1},
+        'vision_model': {'type': 'string', 'minLength': 1},
+        'local_detector_model': {'type': ['string', 'null']},
+        'local_detector_confidence': {'type': 'number', 'minimum': 0, 'maximum': 1},
+        'bot_delay': _NUMBER_OR_NULL,
+        'tap_delay': _NUMBER_OR_NULL,
+        'swipe_delay': _NUMBER_OR_NULL,
+        'text_delay': _NUMBER_OR_NULL,
+        'device_port': {'type': 'integer', 'minimum': 1, 'maximum': 65535},
+        'screenshot_history': {'type': 'integer', 'minimum': 1},
+        'matching_criteria': {
+            'type': 'object',
+            'properties': {
+                'min_age': {'type': 'integer', 'minimum': 18},
+                'max_age': {'type': 'integer', 'minimum': 18},
+                'preferred_interests': {'type': 'array', 'items': {'type': 'string'}},
+                'deal_breakers': {'type': 'array', 'items': {'type': 'string'}},
+                'personality_traits': {'type': 'array', 'items': {'type': 'string'}}
+            }
+        }
+    }
+}
+
+_VALIDATOR = Draft202012Validator(CONFIG_SCHEMA)
+
+
+def _dumps(data: Dict[str, Any], indent: bool = False) -> bytes:
+    """Serialize configuration to JSON bytes with sorted keys"""
+    if orjson:
+        option = orjson.OPT_SORT_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(data, option=option)
+    return json.dumps(data, indent=2 if indent else None, sort_keys=True).encode('utf-8')
+
 
 class Config:
     """Configuration management class"""
     
     def __init__(self, config_path: Optional[str] = None):
         self.config_path = config_path or "config.json"
+        self._bot_cfg = None
+        self._device_cfg = None
+        self._ai_cfg = None
+        self._criteria_sets = None
+        self._validated_hash = None
         self.config = self._load_default_config()
         self._load_config()
         self._load_env_vars()
@@ -33,9 +93,16 @@ class Config:
             'device_ip': None,
             'device_port': 5555,
             'screenshot_dir': 'screenshots',
+            'screenshot_history': 20,
             
             # AI settings
             'openai_api_key': None,
+            'vision_model': 'gpt-4o-mini',
+            'local_detector_model': None,
+            'local_detector_confidence': 0.6,
+            'decision_cache_file': '~/.hinge_bot/decision_cache.json',
+            'decision_cache_size': 2048,
+            'screen_cache_size': 128,
             'tesseract_config': '--psm 6 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789.,!? ',
             
             # Matching criteria
@@ -75,10 +142,11 @@ class Config:
         """Load configuration from file"""
         try:
             if os.path.exists(self.config_path):
-                with open(self.config_path, 'r') as f:
-                    file_config = json.load(f)
-                    self.config.update(file_config)
-                    logger.info(f"Loaded configuration from {self.config_path}")
+                with open(self.config_path, 'rb') as f:
+                    data = f.read()
+                file_config = orjson.loads(data) if orjson else json.loads(data)
+                self.config.update(file_config)
+                logger.info(f"Loaded configuration from {self.config_path}")
             else:
                 logger.info(f"Config file {self.config_path} not found, using defaults")
         except Exception as e:
@@ -87,25 +155,16 @@ class Config:
     def _load_env_vars(self) -> None:
         """Load configuration from environment variables"""
         try:
-            # OpenAI API key
-            if 'OPENAI_API_KEY' in os.environ:
-                self.config['openai_api_key'] = os.environ['OPENAI_API_KEY']
-            
-            # Device IP
-            if 'DEVICE_IP' in os.environ:
-                self.config['device_ip'] = os.environ['DEVICE_IP']
-            
-            # Device port
-            if 'DEVICE_PORT' in os.environ:
-                self.config['device_port'] = int(os.environ['DEVICE_PORT'])
-            
-            # Bot delay
-            if 'BOT_DELAY' in os.environ:
-                self.config['bot_delay'] = int(os.environ['BOT_DELAY'])
-            
-            # Log level
-            if 'LOG_LEVEL' in os.environ:
-                self.config['log_level'] = os.environ['LOG_LEVEL']
+            env = os.environ
+            for env_key, config_key, cast in ENV_MAP:
+                value = env.get(env_key)
+                if not value:
+                    continue
+                # A malformed value only skips its own key
+                try:
+                    self.config[config_key] = cast(value)
+                except ValueError:
+                    logger.error(f"Invalid value for {env_key}: {value!r}")
             
             logger.info("Loaded environment variables")
             
@@ -119,16 +178,26 @@ class Config:
     def set(self, key: str, value: Any) -> None:
         """Set configuration value"""
         self.config[key] = value
+        self._invalidate_cache()
     
     def update(self, updates: Dict[str, Any]) -> None:
         """Update multiple configuration values"""
         self.config.update(updates)
+        self._invalidate_cache()
+    
+    def _invalidate_cache(self) -> None:
+        """Drop memoized config views so they are rebuilt on next access"""
+        self._bot_cfg = None
+        self._device_cfg = None
+        self._ai_cfg = None
+        self._criteria_sets = None
     
     def save(self) -> bool:
         """Save configuration to file"""
         try:
-            with open(self.config_path, 'w') as f:
-                json.dump(self.config, f, indent=2)
+            data = _dumps(self.config, indent=True)
+            with open(self.config_path, 'wb') as f:
+                f.write(data)
             logger.info(f"Configuration saved to {self.config_path}")
             return True
         except Exception as e:
@@ -138,34 +207,28 @@ class Config:
     def validate(self) -> bool:
         """Validate configuration"""
         try:
-            # Check required settings
-            required_keys = ['openai_api_key']
-            for key in required_keys:
-                if not self.config.get(key):
-                    logger.error(f"Required configuration key missing: {key}")
-                    return False
-            
-            # Validate numeric values
-            numeric_keys = ['bot_delay', 'tap_delay', 'swipe_delay', 'text_delay']
-            for key in numeric_keys:
-                value = self.config.get(key)
-                if value is not None and not isinstance(value, (int, float)):
-                    logger.error(f"Invalid numeric value for {key}: {value}")
-                    return False
+            # Skip re-validation when the configuration is unchanged
+            config_hash = hashlib.sha256(_dumps(self.config)).digest()
+            if config_hash == self._validated_hash:
+                return True
             
-            # Validate matching criteria
-            criteria = self.config.get('matching_criteria', {})
-            if not isinstance(criteria, dict):
-                logger.error("Invalid matching criteria format")
+            # Check structure and types against the schema
+            errors = list(_VALIDATOR.iter_errors(self.config))
+            for error in errors:
+                location = '.'.join(str(part) for part in error.absolute_path) or 'config'
+                logger.error(f"Invalid configuration at {location}: {error.message}")
+            if errors:
                 return False
             
             # Validate age range
+            criteria = self.config.get('matching_criteria', {})
             min_age = criteria.get('min_age', 0)
             max_age = criteria.get('max_age', 0)
             if min_age >= max_age:
                 logger.error("Invalid age range: min_age must be less than max_age")
                 return False
             
+            self._validated_hash = config_hash
             logger.info("Configuration validation passed")
             return True
             
@@ -208,34 +271,52 @@ LOG_LEVEL=INFO
         """Get matching criteria configuration"""
         return self.config.get('matching_criteria', {})
     
+    def get_matching_sets(self) -> Dict[str, frozenset]:
+        """Get matching criteria keyword lists as lowercased frozensets"""
+        if self._criteria_sets is None:
+            criteria = self.get_matching_criteria()
+            self._criteria_sets = {
+                key: frozenset(item.lower() for item in criteria.get(key, []))
+                for key in ('preferred_interests', 'deal_breakers', 'personality_traits')
+            }
+        return self._criteria_sets
+    
     def update_matching_criteria(self, criteria: Dict[str, Any]) -> None:
         """Update matching criteria"""
         self.config['matching_criteria'] = criteria
+        self._invalidate_cache()
         logger.info("Matching criteria updated")
     
     def get_device_config(self) -> Dict[str, Any]:
         """Get device configuration"""
-        return {
-            'ip': self.config.get('device_ip'),
-            'port': self.config.get('device_port', 5555),
-            'screenshot_dir': self.config.get('screenshot_dir', 'screenshots')
-        }
+        if self._device_cfg is None:
+            self._device_cfg = {
+                'ip': self.config.get('device_ip'),
+                'port': self.config.get('device_port', 5555),
+                'screenshot_dir': self.config.get('screenshot_dir', 'screenshots')
+            }
+        return self._device_cfg
     
     def get_ai_config(self) -> Dict[str, Any]:
         """Get AI configuration"""
-        return {
-            'openai_api_key': self.config.get('openai_api_key'),
-            'tesseract_config': self.config.get('tesseract_config')
-        }
+        if self._ai_cfg is None:
+            self._ai_cfg = {
+                'openai_api_key': self.config.get('openai_api_key'),
+                'vision_model': self.config.get('vision_model', 'gpt-4o-mini'),
+                'tesseract_config': self.config.get('tesseract_config')
+            }
+        return self._ai_cfg
     
     def get_bot_config(self) -> Dict[str, Any]:
         """Get bot configuration"""
-        return {
-            'bot_delay': self.config.get('bot_delay', 3),
-            'tap_delay': self.config.get('tap_delay', 1.0),
-            'swipe_delay': self.config.get('swipe_delay', 2.0),
-            'text_delay': self.config.get('text_delay', 0.5)
-        }
+        if self._bot_cfg is None:
+            self._bot_cfg = {
+                'bot_delay': self.config.get('bot_delay', 3),
+                'tap_delay': self.config.get('tap_delay', 1.0),
+                'swipe_delay': self.config.get('swipe_delay', 2.0),
+                'text_delay': self.config.get('text_delay', 0.5)
+            }
+        return self._bot_cfg
     
     def setup_directories(self) -> bool:
         """Setup required directories"""
@@ -246,9 +327,13 @@ LOG_LEVEL=INFO
                 'logs'
             ]
             
-            for directory in directories:
-                Path(directory).mkdir(parents=True, exist_ok=True)
-                logger.info(f"Created directory: {directory}")
+            # Skip the mkdir syscall for directories left by a previous run
+            created = [d for d in directories if not os.path.isdir(d)]
+            for directory in created:
+                os.makedirs(directory, exist_ok=True)
+            
+            if created:
+                logger.info("Created directories: %s", ", ".join(created))
             
             return True
             
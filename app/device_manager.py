@@ -3,14 +3,49 @@ Device Manager - Handles ADB connection and device operations
 """
 
 import os
+import re
 import time
+import base64
 import logging
+from pathlib import Path
+from collections import deque
 from typing import Optional, Tuple
 from ppadb.client import Client as AdbClient
 from PIL import Image
 
 logger = logging.getLogger(__name__)
 
+# Characters that need escaping for `input text`: spaces and control characters (a newline
+# would end the shell command) become %s, shell metacharacters are backslash-escaped
+_INPUT_ESCAPE_MAP = {
+    ' ': '%s',
+    **{chr(c): '%s' for c in (*range(32), 127)},
+    **{c: '\\' + c for c in '\'"&<>()|;$`\\*?#~{}[]!'}
+}
+_INPUT_ESCAPE = re.compile('[' + re.escape(''.join(_INPUT_ESCAPE_MAP)) + ']')
+
+# Physical resolution reported by `wm size`
+_WM_SIZE_RE = re.compile(r"Physical size:\s*(\d+)x(\d+)")
+
+# Auto-named screenshots, numbered in capture order
+_SCREENSHOT_NAME = re.compile(r"screenshot_(\d+)\.png")
+
+# Touchscreen discovery in `getevent -pl` output
+_GETEVENT_DEVICE = re.compile(r"add device \d+: (\S+)")
+_ABS_MT_X_MAX = re.compile(r"ABS_MT_POSITION_X\s*:.*?max (\d+)")
+_ABS_MT_Y_MAX = re.compile(r"ABS_MT_POSITION_Y\s*:.*?max (\d+)")
+
+# Linux input event codes used for raw multi-touch swipes
+EV_SYN, EV_KEY, EV_ABS = 0, 1, 3
+BTN_TOUCH = 330
+ABS_MT_POSITION_X, ABS_MT_POSITION_Y, ABS_MT_TRACKING_ID = 53, 54, 57
+SWIPE_FRAMES = 10
+
+# Commands on the persistent shell are followed by an echo of this marker, a sequence number
+# and the exit status; the command has finished once that line is read back
+SHELL_DONE_MARKER = "__hab_done_"
+SHELL_TIMEOUT = 10.0
+
 
 class DeviceManager:
     """Manages ADB device connection and operations"""
@@ -21,7 +56,23 @@ class DeviceManager:
         self.device = None
         self.screen_width = 0
         self.screen_height = 0
+        self._xmax = 0
+        self._ymax = 0
+        self._connect_callbacks = []
+        self._shell_stream = None
+        self._shell_seq = 0
+        self._screenshot_dir = Path(self.config.get('screenshot_dir', 'screenshots'))
+        self._shot_seq = 0
+        self._screenshot_history = self.config.get('screenshot_history', 20)
+        # Auto-named screenshots on disk, oldest first
+        self._saved_shots = deque()
+        self._has_adbkb = None
+        self._touch_device = None
         
+    def add_connect_callback(self, callback) -> None:
+        """Register a callable to run after every successful connect"""
+        self._connect_callbacks.append(callback)
+    
     def connect(self) -> bool:
         """Connect to Android device via ADB"""
         try:
@@ -45,6 +96,20 @@ class DeviceManager:
             # Get screen dimensions
             self._get_screen_dimensions()
             
+            # Re-probe the input method on the (possibly different) device
+            self._has_adbkb = None
+            
+            # Make sure the screenshot directory exists once, not per capture
+            self._screenshot_dir.mkdir(parents=True, exist_ok=True)
+            self._scan_screenshots()
+            
+            # Open a persistent shell for input commands
+            self._open_shell_stream()
+            self._touch_device = self._find_touch_device() if self._shell_stream else None
+            
+            for callback in self._connect_callbacks:
+                callback()
+            
             return True
             
         except Exception as e:
@@ -56,9 +121,9 @@ class DeviceManager:
         try:
             # Get screen size using wm size command
             result = self.device.shell("wm size")
-            if "Physical size:" in result:
-                size_str = result.split("Physical size: ")[1].strip()
-                width, height = map(int, size_str.split("x"))
+            match = _WM_SIZE_RE.search(result)
+            if match:
+                width, height = int(match.group(1)), int(match.group(2))
                 self.screen_width = width
                 self.screen_height = height
                 logger.info(f"Screen dimensions: {width}x{height}")
@@ -72,35 +137,190 @@ class DeviceManager:
             logger.error(f"Failed to get screen dimensions: {e}")
             self.screen_width = 1080
             self.screen_height = 1920
+        
+        # Largest valid coordinates, used to clamp taps and swipes
+        self._xmax = self.screen_width - 1
+        self._ymax = self.screen_height - 1
+    
+    def _find_touch_device(self) -> Optional[Tuple[str, int, int]]:
+        """Find a writable touchscreen input device as (path, x_max, y_max)"""
+        try:
+            result = self.device.shell("getevent -pl")
+            parts = _GETEVENT_DEVICE.split(result)
+            # split() yields [preamble, path1, body1, path2, body2, ...]
+            for path, body in zip(parts[1::2], parts[2::2]):
+                x_max = _ABS_MT_X_MAX.search(body)
+                y_max = _ABS_MT_Y_MAX.search(body)
+                if not (x_max and y_max):
+                    continue
+                if "ok" not in self.device.shell(f"test -w {path} && echo ok"):
+                    logger.info(f"Touchscreen {path} is not writable, using input swipe")
+                    return None
+                logger.info(f"Using touchscreen {path} for raw swipes")
+                return path, int(x_max.group(1)), int(y_max.group(1))
+        except Exception as e:
+            logger.warning(f"Could not probe touchscreen device: {e}")
+        return None
+    
+    def _sendevent_swipe(self, start_x: int, start_y: int, end_x: int, end_y: int, duration: int) -> str:
+        """Build a shell command that performs a swipe with raw sendevent writes"""
+        path, x_max, y_max = self._touch_device
+        # Map screen pixels onto the touchscreen's own coordinate range
+        x_scale = x_max / max(self._xmax, 1)
+        y_scale = y_max / max(self._ymax, 1)
+        frame_sleep = duration / 1000 / SWIPE_FRAMES
+        
+        def event(ev_type: int, code: int, value: int) -> str:
+            return f"sendevent {path} {ev_type} {code} {value}"
+        
+        commands = [event(EV_ABS, ABS_MT_TRACKING_ID, 0), event(EV_KEY, BTN_TOUCH, 1)]
+        for frame in range(SWIPE_FRAMES + 1):
+            x = start_x + (end_x - start_x) * frame // SWIPE_FRAMES
+            y = start_y + (end_y - start_y) * frame // SWIPE_FRAMES
+            commands += [
+                event(EV_ABS, ABS_MT_POSITION_X, int(x * x_scale)),
+                event(EV_ABS, ABS_MT_POSITION_Y, int(y * y_scale)),
+                event(EV_SYN, 0, 0),
+            ]
+            if frame < SWIPE_FRAMES:
+                commands.append(f"sleep {frame_sleep:.3f}")
+        commands += [
+            event(EV_ABS, ABS_MT_TRACKING_ID, 4294967295),
+            event(EV_KEY, BTN_TOUCH, 0),
+            event(EV_SYN, 0, 0),
+        ]
+        return "; ".join(commands)
+    
+    def _open_shell_stream(self) -> None:
+        """Open a persistent interactive shell used to run input commands"""
+        self._close_shell_stream()
+        try:
+            conn = self.device.create_connection()
+            conn.send("shell:")
+            conn.socket.settimeout(SHELL_TIMEOUT)
+            self._shell_stream = conn
+            logger.debug("Opened persistent shell session")
+        except Exception as e:
+            logger.warning(f"Could not open persistent shell, using one-shot commands: {e}")
+            self._shell_stream = None
+    
+    def _close_shell_stream(self) -> None:
+        """Close the persistent shell session if open"""
+        if self._shell_stream:
+            try:
+                self._shell_stream.close()
+            except Exception:
+                pass
+            self._shell_stream = None
+    
+    def _run_shell_stream(self, command: str) -> int:
+        """Run a command on the persistent shell and wait for it to finish, returning its exit status"""
+        sock = self._shell_stream.socket
+        self._shell_seq += 1
+        done = re.compile(rf"{SHELL_DONE_MARKER}{self._shell_seq}:(\d+):".encode('ascii'))
+        # The empty quotes keep the terminal's echo of the command line from matching the marker
+        sock.sendall(f"{command}; echo {SHELL_DONE_MARKER}''{self._shell_seq}:$?:\n".encode('utf-8'))
+        
+        output = b''
+        deadline = time.monotonic() + SHELL_TIMEOUT
+        while True:
+            match = done.search(output)
+            if match:
+                return int(match.group(1))
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"no completion after {SHELL_TIMEOUT:.0f}s")
+            sock.settimeout(remaining)
+            chunk = sock.recv(4096)
+            if not chunk:
+                raise EOFError("persistent shell closed")
+            # Keep just enough earlier output to match a marker split across reads
+            output = output[-64:] + chunk
+    
+    def _run_shell(self, command: str) -> None:
+        """Run a shell command and wait for it to finish, through the persistent session or a one-shot shell"""
+        if self._shell_stream:
+            try:
+                status = self._run_shell_stream(command)
+            except TimeoutError:
+                # The command may still run, so it is not repeated; start a fresh session for the next one
+                self._open_shell_stream()
+                raise
+            except (OSError, EOFError) as e:
+                logger.warning(f"Persistent shell failed, running command in a one-shot shell: {e}")
+                self._open_shell_stream()
+            else:
+                if status != 0:
+                    raise RuntimeError(f"`{command}` exited with status {status}")
+                return
+        
+        self.device.shell(command)
     
     def capture_screenshot(self, save_path: Optional[str] = None) -> Optional[str]:
         """Capture screenshot from device"""
+        save_path, _ = self.capture_screenshot_data(save_path)
+        return save_path
+    
+    def capture_screenshot_data(self, save_path: Optional[str] = None) -> Tuple[Optional[str], Optional[bytes]]:
+        """Capture screenshot from device, returning both the saved path and the PNG bytes"""
         try:
             if not self.device:
                 logger.error("Device not connected")
-                return None
+                return None, None
             
             # Capture screenshot
             screenshot = self.device.screencap()
             
             # Generate filename if not provided
             if not save_path:
-                timestamp = int(time.time())
-                save_path = f"screenshots/screenshot_{timestamp}.png"
-            
-            # Ensure directory exists
-            os.makedirs(os.path.dirname(save_path), exist_ok=True)
+                self._shot_seq += 1
+                save_path = str(self._screenshot_dir / f"screenshot_{self._shot_seq:08d}.png")
+                
+                # Keep only the most recent screenshots on disk, this one included
+                self._prune_screenshots(self._screenshot_history - 1)
+                self._saved_shots.append(save_path)
+            else:
+                # Ensure custom directory exists
+                os.makedirs(os.path.dirname(save_path) or '.', exist_ok=True)
             
             # Save screenshot
             with open(save_path, "wb") as f:
                 f.write(screenshot)
             
-            logger.debug(f"Screenshot saved: {save_path}")
-            return save_path
+            logger.debug("Screenshot saved: %s", save_path)
+            return save_path, screenshot
             
         except Exception as e:
             logger.error(f"Failed to capture screenshot: {e}")
-            return None
+            return None, None
+    
+    def _scan_screenshots(self) -> None:
+        """Number new screenshots after those left by earlier sessions, pruning them to the history size"""
+        try:
+            shots = []
+            for entry in os.scandir(self._screenshot_dir):
+                match = _SCREENSHOT_NAME.fullmatch(entry.name)
+                if match:
+                    shots.append((int(match.group(1)), entry.path))
+            shots.sort()
+            
+            self._saved_shots = deque(path for _, path in shots)
+            if shots:
+                self._shot_seq = max(self._shot_seq, shots[-1][0])
+            self._prune_screenshots(self._screenshot_history)
+        except Exception as e:
+            logger.error(f"Error scanning screenshot directory: {e}")
+    
+    def _prune_screenshots(self, keep: int) -> None:
+        """Delete the oldest auto-named screenshots until at most keep remain"""
+        while self._saved_shots and len(self._saved_shots) > max(keep, 0):
+            stale = self._saved_shots.popleft()
+            try:
+                os.unlink(stale)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"Error deleting old screenshot {stale}: {e}")
     
     def tap(self, x: int, y: int) -> bool:
         """Tap at specified coordinates"""
@@ -110,11 +330,12 @@ class DeviceManager:
                 return False
             
             # Ensure coordinates are within screen bounds
-            x = max(0, min(x, self.screen_width - 1))
-            y = max(0, min(y, self.screen_height - 1))
+            xmax, ymax = self._xmax, self._ymax
+            x = 0 if x < 0 else xmax if x > xmax else x
+            y = 0 if y < 0 else ymax if y > ymax else y
             
-            self.device.shell(f"input tap {x} {y}")
-            logger.debug(f"Tapped at ({x}, {y})")
+            self._run_shell(f"input tap {x} {y}")
+            logger.debug("Tapped at (%d, %d)", x, y)
             return True
             
         except Exception as e:
@@ -129,13 +350,18 @@ class DeviceManager:
                 return False
             
             # Ensure coordinates are within screen bounds
-            start_x = max(0, min(start_x, self.screen_width - 1))
-            start_y = max(0, min(start_y, self.screen_height - 1))
-            end_x = max(0, min(end_x, self.screen_width - 1))
-            end_y = max(0, min(end_y, self.screen_height - 1))
+            xmax, ymax = self._xmax, self._ymax
+            start_x = 0 if start_x < 0 else xmax if start_x > xmax else start_x
+            start_y = 0 if start_y < 0 else ymax if start_y > ymax else start_y
+            end_x = 0 if end_x < 0 else xmax if end_x > xmax else end_x
+            end_y = 0 if end_y < 0 else ymax if end_y > ymax else end_y
             
-            self.device.shell(f"input swipe {start_x} {start_y} {end_x} {end_y} {duration}")
-            logger.debug(f"Swiped from ({start_x}, {start_y}) to ({end_x}, {end_y})")
+            # Raw touch events skip the JVM start-up of the `input` command
+            if self._touch_device and self._shell_stream:
+                self._run_shell(self._sendevent_swipe(start_x, start_y, end_x, end_y, duration))
+            else:
+                self._run_shell(f"input swipe {start_x} {start_y} {end_x} {end_y} {duration}")
+            logger.debug("Swiped from (%d, %d) to (%d, %d)", start_x, start_y, end_x, end_y)
             return True
             
         except Exception as e:
@@ -149,16 +375,45 @@ class DeviceManager:
                 logger.error("Device not connected")
                 return False
             
+            # Set the whole text in one broadcast when ADBKeyBoard is the active IME
+            if self._adb_keyboard_available() and self._input_text_adbkb(text):
+                logger.debug("Input text via ADBKeyBoard: %s", text)
+                return True
+            
             # Escape special characters for shell command
-            escaped_text = text.replace(" ", "%s").replace("'", "\\'")
-            self.device.shell(f"input text '{escaped_text}'")
-            logger.debug(f"Input text: {text}")
+            escaped_text = _INPUT_ESCAPE.sub(lambda m: _INPUT_ESCAPE_MAP[m.group(0)], text)
+            self._run_shell(f"input text {escaped_text}")
+            logger.debug("Input text: %s", text)
             return True
             
         except Exception as e:
             logger.error(f"Failed to input text: {e}")
             return False
     
+    def _adb_keyboard_available(self) -> bool:
+        """Check (once per connection) whether ADBKeyBoard is the active input method"""
+        if self._has_adbkb is None:
+            try:
+                ime = self.device.shell("settings get secure default_input_method")
+                self._has_adbkb = "com.android.adbkeyboard" in ime
+            except Exception as e:
+                logger.warning(f"Could not query input method: {e}")
+                self._has_adbkb = False
+            logger.info(f"ADBKeyBoard input method available: {self._has_adbkb}")
+        return self._has_adbkb
+    
+    def _input_text_adbkb(self, text: str) -> bool:
+        """Send text through the ADBKeyBoard broadcast, returning False on failure"""
+        try:
+            b64 = base64.b64encode(text.encode('utf-8')).decode('ascii')
+            result = self.device.shell(f"am broadcast -a ADB_INPUT_B64 --es msg {b64}")
+            if "result=0" in result:
+                return True
+            logger.warning(f"ADBKeyBoard broadcast failed: {result.strip()}")
+        except Exception as e:
+            logger.warning(f"ADBKeyBoard broadcast failed: {e}")
+        return False
+    
     def press_key(self, keycode: str) -> bool:
         """Press a specific key"""
         try:
@@ -166,8 +421,8 @@ class DeviceManager:
                 logger.error("Device not connected")
                 return False
             
-            self.device.shell(f"input keyevent {keycode}")
-            logger.debug(f"Pressed key: {keycode}")
+            self._run_shell(f"input keyevent {keycode}")
+            logger.debug("Pressed key: %s", keycode)
             return True
             
         except Exception as e:
@@ -180,6 +435,7 @@ class DeviceManager:
     
     def disconnect(self) -> None:
         """Disconnect from device"""
+        self._close_shell_stream()
         if self.device:
             logger.info("Disconnecting from device")
             self.device = None
@@ -0,0 +1,74 @@
+"""
+Frame - A captured screenshot shared by every component looking at it
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import hashlib
+from typing import Optional, Tuple, Union
+from dataclasses import dataclass, field
+from PIL import Image
+
+
+def load_image_bytes(path: str) -> bytes:
+    """Read a whole image file into one buffer, sized up front from fstat"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        data = os.read(fd, size)
+        # Regular files are normally read in one call; finish any short read
+        while len(data) < size:
+            chunk = os.read(fd, size - len(data))
+            if not chunk:
+                break
+            data += chunk
+        return data
+    finally:
+        os.close(fd)
+
+
+@dataclass(eq=False)
+class Frame:
+    """A captured screenshot whose bytes, digest, decoded image and upload encoding are each produced once, on first use"""
+    path: Optional[str] = None
+    raw: Optional[bytes] = field(default=None, repr=False)
+    _sha256: Optional[bytes] = field(default=None, init=False, repr=False)
+    _rgb: Optional[Image.Image] = field(default=None, init=False, repr=False)
+    encoded: Optional[Tuple[str, Tuple[int, int], float]] = field(default=None, init=False, repr=False)
+    
+    @classmethod
+    def of(cls, screenshot: Screenshot) -> Frame:
+        """Wrap a path or raw bytes in a Frame; frames are passed through unchanged"""
+        if isinstance(screenshot, Frame):
+            return screenshot
+        if isinstance(screenshot, bytes):
+            return cls(raw=screenshot)
+        return cls(path=screenshot)
+    
+    @property
+    def data(self) -> bytes:
+        """Raw image file contents"""
+        if self.raw is None:
+            self.raw = load_image_bytes(self.path)
+        return self.raw
+    
+    @property
+    def sha256(self) -> bytes:
+        """SHA-256 digest of the image file contents"""
+        if self._sha256 is None:
+            self._sha256 = hashlib.sha256(memoryview(self.data)).digest()
+        return self._sha256
+    
+    @property
+    def rgb(self) -> Image.Image:
+        """Decoded RGB image, shared by every detector looking at this frame"""
+        if self._rgb is None:
+            with Image.open(io.BytesIO(self.data)) as img:
+                self._rgb = img.convert('RGB')
+        return self._rgb
+
+
+# A screenshot may be given as a file path, as raw image bytes already in memory, or as a Frame
+Screenshot = Union[str, bytes, Frame]
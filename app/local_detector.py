@@ -0,0 +1,93 @@
+"""
+Local Detector - On-device UI control detection with a small ONNX object detector
+"""
+
+import logging
+import numpy as np
+from typing import Dict, Optional, Tuple
+from PIL import Image
+
+try:
+    import onnxruntime
+except ImportError:  # Local detection is disabled when onnxruntime is unavailable
+    onnxruntime = None
+
+try:
+    import cv2
+except ImportError:  # Fall back to Pillow resizing when OpenCV is unavailable
+    cv2 = None
+
+logger = logging.getLogger(__name__)
+
+# Model classes, in output order (a YOLOv8-style model trained on labelled Hinge screenshots)
+DETECTOR_CLASSES = ('like', 'pass', 'comment', 'text_input', 'send')
+
+# Execution providers in order of preference; only the installed ones are used
+PREFERRED_PROVIDERS = ('CoreMLExecutionProvider', 'DmlExecutionProvider', 'CPUExecutionProvider')
+
+# Input size used when the model declares dynamic dimensions
+DEFAULT_INPUT_SIZE = 640
+
+
+class LocalDetector:
+    """Locates UI controls with an ONNX detector exported from YOLOv8 (output: 1 x (4 + classes) x anchors)"""
+    
+    def __init__(self, model_path: str, confidence_threshold: float = 0.6):
+        available = onnxruntime.get_available_providers()
+        providers = [provider for provider in PREFERRED_PROVIDERS if provider in available]
+        self.session = onnxruntime.InferenceSession(model_path, providers=providers)
+        self.confidence_threshold = confidence_threshold
+        
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        height, width = model_input.shape[2:4]
+        self.input_size = (width if isinstance(width, int) else DEFAULT_INPUT_SIZE,
+                           height if isinstance(height, int) else DEFAULT_INPUT_SIZE)
+        
+        logger.info(f"Local detector loaded from {model_path} ({', '.join(providers)})")
+    
+    def detect(self, image: Image.Image) -> Dict[str, Tuple[int, int]]:
+        """Find the center of the most confident detection of each control above the threshold"""
+        width, height = image.size
+        input_width, input_height = self.input_size
+        
+        # Resize to the model input, HWC uint8 -> NCHW float32 in [0, 1]
+        rgb = np.asarray(image if image.mode == 'RGB' else image.convert('RGB'))
+        if cv2 is not None:
+            resized = cv2.resize(rgb, (input_width, input_height), interpolation=cv2.INTER_LINEAR)
+        else:
+            resized = np.asarray(Image.fromarray(rgb).resize((input_width, input_height), Image.Resampling.BILINEAR))
+        tensor = (resized.transpose(2, 0, 1)[np.newaxis].astype(np.float32) / 255.0)
+        
+        output = self.session.run(None, {self.input_name: tensor})[0][0]
+        boxes, scores = output[:4], output[4:4 + len(DETECTOR_CLASSES)]
+        
+        # Best anchor per class; no NMS is needed since only one box per class is kept
+        best = scores.argmax(axis=1)
+        best_scores = scores[np.arange(len(scores)), best]
+        scale_x = width / input_width
+        scale_y = height / input_height
+        
+        controls = {}
+        for class_index, (anchor, score) in enumerate(zip(best, best_scores)):
+            if score < self.confidence_threshold:
+                continue
+            center_x, center_y = boxes[0, anchor], boxes[1, anchor]
+            controls[DETECTOR_CLASSES[class_index]] = (int(center_x * scale_x), int(center_y * scale_y))
+        
+        return controls
+
+
+def load_local_detector(model_path: Optional[str], confidence_threshold: float = 0.6) -> Optional[LocalDetector]:
+    """Load the local detector if a model is configured and onnxruntime is installed"""
+    if not model_path:
+        return None
+    if onnxruntime is None:
+        logger.warning("local_detector_model is set but onnxruntime is not installed; using AI vision only")
+        return None
+    
+    try:
+        return LocalDetector(model_path, confidence_threshold)
+    except Exception as e:
+        logger.error(f"Failed to load local detector: {e}")
+        return None
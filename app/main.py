@@ -6,13 +6,16 @@ AI agent for automated Hinge dating app interactions
 
 import os
 import sys
-import time
+import asyncio
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Optional, Dict, Any
 from dotenv import load_dotenv
 
 from .device_manager import DeviceManager
-from .ui_detector import UIDetector
+from .frame import Frame
+from .ui_detector import UIDetector, COMMENT_CONTROLS
 from .text_extractor import TextExtractor
 from .profile_analyzer import ProfileAnalyzer
 from .interaction_controller import InteractionController
@@ -32,6 +35,20 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Per-process TextExtractor used by the OCR worker pool
+_worker_extractor = None
+
+
+def _init_ocr_worker(config: Config) -> None:
+    """Create the TextExtractor for an OCR worker process"""
+    global _worker_extractor
+    _worker_extractor = TextExtractor(config)
+
+
+def preprocess_and_ocr(screenshot_path: str) -> str:
+    """Preprocess a screenshot and extract its text in an OCR worker process"""
+    return _worker_extractor.extract_text(screenshot_path)
+
 
 class HingeAutoBot:
     """Main Hinge automation bot class"""
@@ -44,6 +61,7 @@ class HingeAutoBot:
         self.text_extractor = None
         self.profile_analyzer = None
         self.interaction_controller = None
+        self._ocr_pool = None
         
         logger.info("HingeAutoBot initialized")
     
@@ -64,6 +82,9 @@ class HingeAutoBot:
             # Initialize text extractor
             self.text_extractor = TextExtractor(self.config)
             
+            # OCR runs in worker processes so it overlaps with the screen check
+            self._start_ocr_pool()
+            
             # Initialize profile analyzer
             self.profile_analyzer = ProfileAnalyzer(self.config)
             
@@ -92,32 +113,7 @@ class HingeAutoBot:
         logger.info("Starting Hinge automation...")
         
         try:
-            while True:
-                # Capture current screen
-                screenshot_path = self.device_manager.capture_screenshot()
-                if not screenshot_path:
-                    logger.error("Failed to capture screenshot")
-                    time.sleep(5)
-                    continue
-                
-                # Detect if we're on a profile screen
-                if self.ui_detector.is_profile_screen(screenshot_path):
-                    logger.info("Profile screen detected")
-                    
-                    # Extract profile text
-                    profile_text = self.text_extractor.extract_text(screenshot_path)
-                    
-                    # Analyze profile and make decision (pass screenshot for AI vision)
-                    decision = self.profile_analyzer.analyze_profile(profile_text, screenshot_path)
-                    
-                    # Execute interaction based on decision
-                    self.interaction_controller.execute_decision(decision, screenshot_path)
-                    
-                else:
-                    logger.info("Not on profile screen, waiting...")
-                
-                # Wait before next iteration
-                time.sleep(self.config.get('bot_delay', 3))
+            asyncio.run(self.run_async())
                 
         except KeyboardInterrupt:
             logger.info("Bot stopped by user")
@@ -126,8 +122,82 @@ class HingeAutoBot:
         finally:
             self.cleanup()
     
+    def _start_ocr_pool(self) -> None:
+        """Start the OCR worker pool, replacing a broken one"""
+        if self._ocr_pool:
+            self._ocr_pool.shutdown(wait=False, cancel_futures=True)
+        self._ocr_pool = ProcessPoolExecutor(max_workers=2, initializer=_init_ocr_worker,
+                                             initargs=(self.config,))
+    
+    def _submit_ocr(self, screenshot_path: str) -> Optional[asyncio.Future]:
+        """Start OCR of a screenshot in a worker, or None if the pool cannot take it"""
+        try:
+            return asyncio.get_running_loop().run_in_executor(self._ocr_pool, preprocess_and_ocr, screenshot_path)
+        except Exception as e:
+            logger.error(f"OCR pool unavailable, restarting it: {e}")
+            self._start_ocr_pool()
+            return None
+    
+    async def _profile_text(self, ocr_future: Optional[asyncio.Future], screenshot_path: str) -> str:
+        """Wait for the worker's OCR result, extracting the text in-process if the worker failed"""
+        if ocr_future is not None:
+            try:
+                return await ocr_future
+            except Exception as e:
+                logger.error(f"OCR worker failed, extracting text in-process: {e}")
+                if isinstance(e, BrokenProcessPool):
+                    self._start_ocr_pool()
+        
+        return await asyncio.to_thread(self.text_extractor.extract_text, screenshot_path)
+    
+    async def run_async(self) -> None:
+        """Bot loop; OCR runs in a worker while the AI requests for a frame are awaited"""
+        while True:
+            # Capture current screen
+            screenshot_path, screenshot = await asyncio.to_thread(self.device_manager.capture_screenshot_data)
+            if not screenshot_path:
+                logger.error("Failed to capture screenshot")
+                await asyncio.sleep(5)
+                continue
+            
+            # Every detection on this capture shares one read, hash and decode
+            frame = Frame(screenshot_path, screenshot)
+            
+            # Start extracting profile text while the screen type is checked
+            ocr_future = self._submit_ocr(screenshot_path)
+            
+            # Detect if we're on a profile screen (the same analysis locates the buttons)
+            screen = await self.ui_detector.analyze_screen_async(frame)
+            if screen.get('is_profile'):
+                logger.info("Profile screen detected")
+                
+                # Extract profile text
+                profile_text = await self._profile_text(ocr_future, screenshot_path)
+                
+                # Analyze profile and make decision (pass screenshot for AI vision)
+                decision = await self.profile_analyzer.analyze_profile_async(profile_text, frame)
+                # A comment needs controls the on-device detector may not have found
+                required = COMMENT_CONTROLS if decision.action == 'comment' else ()
+                controls = await asyncio.to_thread(self.ui_detector.find_controls, frame, required)
+                
+                # Execute interaction based on decision
+                await asyncio.to_thread(self.interaction_controller.execute_decision,
+                                        decision, screenshot_path, controls)
+                
+            else:
+                if ocr_future is not None:
+                    ocr_future.cancel()
+                logger.info("Not on profile screen, waiting...")
+            
+            # Wait before next iteration
+            await asyncio.sleep(self.config.get('bot_delay', 3))
+    
     def cleanup(self) -> None:
         """Cleanup resources"""
+        if self._ocr_pool:
+            self._ocr_pool.shutdown(cancel_futures=True)
+        if self.profile_analyzer:
+            self.profile_analyzer.save_decision_cache()
         if self.device_manager:
             self.device_manager.disconnect()
         logger.info("Bot cleanup completed")
@@ -0,0 +1,60 @@
+"""
+OpenAI Clients - Shared OpenAI clients with tuned connection pools, and vision upload helpers
+"""
+
+import atexit
+import functools
+import httpx
+import openai
+import logging
+
+try:
+    import pybase64 as base64
+except ImportError:  # Fall back to the stdlib codec when pybase64 is unavailable
+    import base64
+
+logger = logging.getLogger(__name__)
+
+# Connection pool shared by every component talking to the API
+HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+# Retries of rate limited (429), timed out, connection failed and 5xx requests; the SDK backs
+# off exponentially with jitter and waits as long as the server's retry-after header asks
+MAX_RETRIES = 3
+
+# Longest side of screenshots sent to the vision models; the API downsamples larger images anyway
+VISION_MAX_SIZE = 1024
+
+# Prefix of the data URL carrying an encoded screenshot
+DATA_URI_PREFIX = "data:image/jpeg;base64,"
+
+
+@functools.lru_cache(maxsize=4)
+def get_openai_client(api_key: str) -> openai.OpenAI:
+    """Get the process-wide OpenAI client for an API key"""
+    client = openai.OpenAI(
+        api_key=api_key,
+        max_retries=MAX_RETRIES,
+        http_client=httpx.Client(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+    )
+    atexit.register(client.close)
+    logger.debug("Created shared OpenAI client")
+    return client
+
+
+@functools.lru_cache(maxsize=4)
+def get_async_openai_client(api_key: str) -> openai.AsyncOpenAI:
+    """Get the process-wide AsyncOpenAI client for an API key"""
+    client = openai.AsyncOpenAI(
+        api_key=api_key,
+        max_retries=MAX_RETRIES,
+        http_client=httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+    )
+    logger.debug("Created shared AsyncOpenAI client")
+    return client
+
+
+def encode_base64(data: bytes) -> str:
+    """Base64-encode an image for a data URL"""
+    return base64.b64encode(data).decode('ascii')
@@ -2,15 +2,112 @@
 Profile Analyzer - AI-powered profile analysis and matching
 """
 
-import openai
+import io
+import os
+import re
+import asyncio
 import logging
 import json
-from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass
+import hashlib
+import functools
+import numpy as np
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple, Union
+from dataclasses import dataclass, asdict
+from PIL import Image
+from .openai_clients import (
+    get_openai_client, get_async_openai_client, encode_base64, VISION_MAX_SIZE, DATA_URI_PREFIX
+)
+from .frame import Frame, Screenshot
 
 logger = logging.getLogger(__name__)
 
 
+# Prompt templates; the system prompt is formatted once per criteria change
+SYSTEM_PROMPT_TEMPLATE = """You are an AI assistant that analyzes dating profiles and makes matching decisions based on compatibility criteria.
+
+MATCHING CRITERIA:
+{criteria_text}
+
+Please respond with a JSON object containing:
+1. "action": "like", "pass", or "comment"
+2. "confidence": float between 0.0 and 1.0
+3. "reason": brief explanation of the decision
+4. "comment": if action is "comment", provide a personalized, witty one-liner
+
+Guidelines:
+- Like profiles that match most criteria and seem compatible
+- Pass on profiles with deal-breakers or poor compatibility
+- Comment on profiles that are interesting but need a conversation starter
+- Be selective but not overly picky
+- Consider age, interests, and personality traits
+- Avoid generic or inappropriate comments
+
+Response format:
+{{
+    "action": "like|pass|comment",
+    "confidence": 0.85,
+    "reason": "Profile shows good compatibility with shared interests in technology and travel",
+    "comment": "Your travel photos look amazing! What's the most adventurous place you've been?"
+}}
+"""
+
+ANALYSIS_PROMPT_TEMPLATE = """
+Analyze this dating profile and make a matching decision based on the matching criteria.
+
+PROFILE TEXT:
+{profile_text}
+"""
+
+VISION_PROMPT_TEMPLATE = """
+Analyze this dating app profile screenshot and make a matching decision based on the matching criteria.
+
+PROFILE TEXT (if any):
+{profile_text}
+
+Look at both the visual elements (photos, layout) and any text content to make your decision.
+"""
+
+# Reused decoder for pulling the JSON object out of model responses
+_JSON_DECODER = json.JSONDecoder()
+
+# Two-digit numbers in profile text, read as candidate ages
+_AGE_RE = re.compile(r'\b(\d{2})\b')
+
+
+@functools.lru_cache(maxsize=8)
+def _keyword_pattern(keywords: frozenset) -> Optional[re.Pattern]:
+    """Compile a keyword set into one alternation regex (longest first), or None when empty"""
+    if not keywords:
+        return None
+    return re.compile('|'.join(re.escape(k) for k in sorted(keywords, key=len, reverse=True)))
+
+
+def _b64_image(image: Image.Image) -> str:
+    """Downscale a decoded image to JPEG and base64-encode it, leaving the image itself untouched"""
+    scale = VISION_MAX_SIZE / max(image.size)
+    if scale < 1:
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                             Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=85)
+    return encode_base64(buffer.getvalue())
+
+
+# Near-duplicate frame detection: difference hash size (bits per side), the largest
+# Hamming distance still treated as the same frame, and how many recent frames to keep
+FRAME_HASH_SIZE = 16
+FRAME_MATCH_DISTANCE = 8
+FRAME_HISTORY = 32
+
+
+def _frame_hash(image: Image.Image) -> np.ndarray:
+    """Difference hash of a decoded screenshot: FRAME_HASH_SIZE**2 bools comparing neighbouring pixels"""
+    small = image.convert('L').resize((FRAME_HASH_SIZE + 1, FRAME_HASH_SIZE), Image.Resampling.BILINEAR)
+    pixels = np.asarray(small, dtype=np.int16)
+    return (pixels[:, 1:] > pixels[:, :-1]).ravel()
+
+
 @dataclass
 class ProfileDecision:
     """Represents a decision about a profile"""
@@ -25,7 +122,9 @@ class ProfileAnalyzer:
     
     def __init__(self, config):
         self.config = config
+        self.vision_model = self.config.get('vision_model', 'gpt-4o-mini')
         self.openai_client = None
+        self.async_openai_client = None
         self._setup_openai()
         
         # Default matching criteria
@@ -36,6 +135,25 @@ class ProfileAnalyzer:
             'deal_breakers': ['smoking', 'drugs', 'excessive drinking'],
             'personality_traits': ['intelligent', 'funny', 'adventurous', 'kind']
         })
+        
+        self._refresh_criteria_cache()
+        
+        # Bounded LRU of AI decisions keyed by profile content hash
+        self._decision_cache = OrderedDict()
+        
+        # (frame hash, profile text hash, decision cache key) of recently analyzed screenshots
+        self._recent_frames = deque(maxlen=FRAME_HISTORY)
+        self._decision_cache_size = self.config.get('decision_cache_size', 2048)
+        self._decision_cache_file = os.path.expanduser(
+            self.config.get('decision_cache_file', '~/.hinge_bot/decision_cache.json'))
+        self._load_decision_cache()
+    
+    def _refresh_criteria_cache(self) -> None:
+        """Serialize the criteria once for prompts and cache keys"""
+        self._criteria_text = json.dumps(self.criteria, indent=2)
+        self._system_prompt = SYSTEM_PROMPT_TEMPLATE.format(criteria_text=self._criteria_text)
+        self._criteria_key = json.dumps(self.criteria, sort_keys=True).encode('utf-8')
+        self._age_range = (self.criteria.get('min_age', 21), self.criteria.get('max_age', 35))
     
     def _setup_openai(self) -> None:
         """Setup OpenAI client"""
@@ -45,198 +163,267 @@ class ProfileAnalyzer:
                 logger.error("OpenAI API key not found in configuration")
                 return
             
-            self.openai_client = openai.OpenAI(api_key=api_key)
+            self.openai_client = get_openai_client(api_key)
+            self.async_openai_client = get_async_openai_client(api_key)
             logger.info("OpenAI client initialized")
             
         except Exception as e:
-            logger.error(f"Failed to setup OpenAI client: {e}")
+            logger.error("Failed to setup OpenAI client: %s", e)
     
-    def analyze_profile(self, profile_text: str, screenshot_path: str = None) -> ProfileDecision:
-        """Analyze profile using both text and image"""
+    def analyze_profile(self, profile_text: str, screenshot: Optional[Screenshot] = None) -> ProfileDecision:
+        """Analyze profile using both text and image (a Frame shares the capture's bytes and decode)"""
         try:
-            if not self.openai_client:
-                logger.warning("OpenAI client not available, using fallback analysis")
-                return self._fallback_analysis(profile_text)
+            frame = Frame.of(screenshot) if screenshot else None
+            job = self._start_analysis(profile_text, frame, self.openai_client)
+            if isinstance(job, ProfileDecision):
+                return job
             
-            # Use AI vision if screenshot is available
-            if screenshot_path:
-                return self._analyze_profile_with_vision(profile_text, screenshot_path)
-            else:
-                return self._analyze_profile_text_only(profile_text)
+            cache_key, signature = job
+            # Use AI vision if screenshot is available, falling back to text only
+            for mode in self._analysis_modes(frame):
+                try:
+                    response = self.openai_client.chat.completions.create(
+                        **self._analysis_request(mode, profile_text, frame))
+                    return self._handle_analysis_response(response, cache_key, mode, signature)
+                except Exception as e:
+                    logger.error("Error in %s-based profile analysis: %s", mode, e)
+                    # A text-only decision is not stored under the screenshot's cache key
+                    cache_key = None
+            return self._fallback_analysis(profile_text)
             
         except Exception as e:
-            logger.error(f"Error analyzing profile: {e}")
+            logger.error("Error analyzing profile: %s", e)
             return self._fallback_analysis(profile_text)
     
-    def _analyze_profile_with_vision(self, profile_text: str, screenshot_path: str) -> ProfileDecision:
-        """Analyze profile using AI vision"""
+    async def analyze_profile_async(self, profile_text: str,
+                                    screenshot: Optional[Screenshot] = None) -> ProfileDecision:
+        """Analyze profile using both text and image without blocking the event loop"""
         try:
-            import base64
-            
-            # Encode image to base64
-            with open(screenshot_path, "rb") as image_file:
-                base64_image = base64.b64encode(image_file.read()).decode('utf-8')
-            
-            # Create analysis prompt
-            criteria_text = json.dumps(self.criteria, indent=2)
-            
-            prompt = f"""
-            Analyze this dating app profile screenshot and make a matching decision based on the criteria below.
-
-            PROFILE TEXT (if any):
-            {profile_text}
-
-            MATCHING CRITERIA:
-            {criteria_text}
-
-            Look at both the visual elements (photos, layout) and any text content to make your decision.
-            
-            Please respond with a JSON object containing:
-            1. "action": "like", "pass", or "comment"
-            2. "confidence": float between 0.0 and 1.0
-            3. "reason": brief explanation of the decision
-            4. "comment": if action is "comment", provide a personalized, witty one-liner
-
-            Guidelines:
-            - Like profiles that match most criteria and seem compatible
-            - Pass on profiles with deal-breakers or poor compatibility
-            - Comment on profiles that are interesting but need a conversation starter
-            - Be selective but not overly picky
-            - Consider age, interests, and personality traits
-            - Avoid generic or inappropriate comments
-
-            Response format:
-            {{
-                "action": "like|pass|comment",
-                "confidence": 0.85,
-                "reason": "Profile shows good compatibility with shared interests in technology and travel",
-                "comment": "Your travel photos look amazing! What's the most adventurous place you've been?"
-            }}
-            """
-            
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4-vision-preview",
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are an AI assistant that analyzes dating profiles and makes matching decisions based on compatibility criteria."
-                    },
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                temperature=0.7,
-                max_tokens=500
-            )
-            
-            # Parse response
-            analysis_text = response.choices[0].message.content
-            decision = self._parse_ai_response(analysis_text)
+            # Hashing, decoding and encoding the screenshot run off the event loop
+            frame = Frame.of(screenshot) if screenshot else None
+            job = await asyncio.to_thread(self._start_analysis, profile_text, frame, self.async_openai_client)
+            if isinstance(job, ProfileDecision):
+                return job
             
-            logger.info(f"Profile analysis (vision): {decision.action} (confidence: {decision.confidence:.2f})")
-            return decision
+            cache_key, signature = job
+            # Use AI vision if screenshot is available, falling back to text only
+            for mode in self._analysis_modes(frame):
+                try:
+                    request = await asyncio.to_thread(self._analysis_request, mode, profile_text, frame)
+                    response = await self.async_openai_client.chat.completions.create(**request)
+                    return self._handle_analysis_response(response, cache_key, mode, signature)
+                except Exception as e:
+                    logger.error("Error in %s-based profile analysis: %s", mode, e)
+                    # A text-only decision is not stored under the screenshot's cache key
+                    cache_key = None
+            return self._fallback_analysis(profile_text)
             
         except Exception as e:
-            logger.error(f"Error in vision-based profile analysis: {e}")
-            return self._analyze_profile_text_only(profile_text)
+            logger.error("Error analyzing profile: %s", e)
+            return self._fallback_analysis(profile_text)
+    
+    def _start_analysis(self, profile_text: str, frame: Optional[Frame],
+                        client) -> Union[ProfileDecision, Tuple[str, Optional[Tuple[np.ndarray, bytes]]]]:
+        """Decide without the API if possible, otherwise return the (cache key, frame signature) of the analysis to request"""
+        if not client:
+            logger.warning("OpenAI client not available, using fallback analysis")
+            return self._fallback_analysis(profile_text)
+        
+        # Re-encountered profiles reuse the earlier decision
+        cache_key = self._decision_cache_key(profile_text, frame)
+        cached = self._cached_decision(cache_key)
+        if cached:
+            return cached
+        
+        # Frames of the same profile text that only differ by noise (UI transitions, stuck screens)
+        # reuse a recent decision
+        signature = self._frame_signature(frame, profile_text) if frame else None
+        similar = self._similar_frame_decision(signature)
+        if similar:
+            return similar
+        
+        return cache_key, signature
+    
+    def _cached_decision(self, cache_key: str) -> Optional[ProfileDecision]:
+        """Look up a previous decision for the same profile"""
+        cached = self._decision_cache.get(cache_key)
+        if cached:
+            self._decision_cache.move_to_end(cache_key)
+            logger.info("Profile analysis (cached): %s (confidence: %.2f)", cached.action, cached.confidence)
+        return cached
     
-    def _analyze_profile_text_only(self, profile_text: str) -> ProfileDecision:
-        """Analyze profile using text only"""
+    def _frame_signature(self, frame: Frame, profile_text: str) -> Optional[Tuple[np.ndarray, bytes]]:
+        """Hash a screenshot and its profile text for near-duplicate detection, or None if it cannot be decoded"""
         try:
-            # Create analysis prompt
-            prompt = self._create_analysis_prompt(profile_text)
-            
-            # Get AI analysis
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an AI assistant that analyzes dating profiles and makes matching decisions based on compatibility criteria."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=500
-            )
-            
-            # Parse response
-            analysis_text = response.choices[0].message.content
-            decision = self._parse_ai_response(analysis_text)
-            
-            logger.info(f"Profile analysis (text): {decision.action} (confidence: {decision.confidence:.2f})")
-            return decision
-            
+            frame_hash = _frame_hash(frame.rgb)
         except Exception as e:
-            logger.error(f"Error in text-based profile analysis: {e}")
-            return self._fallback_analysis(profile_text)
+            logger.error("Error hashing screenshot: %s", e)
+            return None
+        # Whitespace and case differences between OCR passes of the same text are ignored
+        text_hash = hashlib.sha256(' '.join(profile_text.lower().split()).encode('utf-8')).digest()
+        return frame_hash, text_hash
+    
+    def _similar_frame_decision(self, signature: Optional[Tuple[np.ndarray, bytes]]) -> Optional[ProfileDecision]:
+        """Look up the decision for a recent screenshot of the same profile text that is nearly identical to this one"""
+        if signature is None:
+            return None
+        
+        # Look-alike layouts (e.g. text-only prompt cards) of different profiles must not share a decision
+        frame_hash, text_hash = signature
+        candidates = [(h, key) for h, text, key in self._recent_frames if text == text_hash]
+        if not candidates:
+            return None
+        
+        hashes = np.stack([h for h, _ in candidates])
+        distances = np.count_nonzero(hashes != frame_hash, axis=1)
+        best = int(distances.argmin())
+        if distances[best] > FRAME_MATCH_DISTANCE:
+            return None
+        
+        decision = self._decision_cache.get(candidates[best][1])
+        if decision:
+            logger.info("Profile analysis (similar frame): %s (confidence: %.2f)", decision.action, decision.confidence)
+        return decision
+    
+    def _remember_frame(self, signature: Optional[Tuple[np.ndarray, bytes]], cache_key: str) -> None:
+        """Record a frame whose AI decision was stored under cache_key; comments are written per profile, so never replayed"""
+        decision = self._decision_cache.get(cache_key) if signature is not None else None
+        if decision and decision.action != 'comment':
+            self._recent_frames.append((*signature, cache_key))
+    
+    def _decision_cache_key(self, profile_text: str, frame: Optional[Frame]) -> str:
+        """Hash the profile text, screenshot contents and criteria into a cache key"""
+        digest = hashlib.sha256(profile_text.encode('utf-8'))
+        if frame is not None:
+            digest.update(frame.data)
+        digest.update(self._criteria_key)
+        return digest.hexdigest()
+    
+    def _remember_decision(self, cache_key: Optional[str], decision: ProfileDecision) -> None:
+        """Store an AI decision in the bounded decision cache"""
+        if not cache_key:
+            return
+        self._decision_cache[cache_key] = decision
+        self._decision_cache.move_to_end(cache_key)
+        while len(self._decision_cache) > self._decision_cache_size:
+            self._decision_cache.popitem(last=False)
+    
+    def _load_decision_cache(self) -> None:
+        """Load persisted decisions from the previous run"""
+        try:
+            if os.path.exists(self._decision_cache_file):
+                with open(self._decision_cache_file, 'r') as f:
+                    entries = json.load(f)
+                for key, data in entries.items():
+                    self._decision_cache[key] = ProfileDecision(**data)
+                logger.info("Loaded %d cached profile decisions", len(entries))
+        except Exception as e:
+            logger.error("Error loading decision cache: %s", e)
+    
+    def save_decision_cache(self) -> bool:
+        """Persist cached decisions so they survive restarts"""
+        try:
+            os.makedirs(os.path.dirname(self._decision_cache_file), exist_ok=True)
+            with open(self._decision_cache_file, 'w') as f:
+                json.dump({key: asdict(decision) for key, decision in self._decision_cache.items()}, f)
+            logger.info("Saved %d cached profile decisions", len(self._decision_cache))
+            return True
+        except Exception as e:
+            logger.error("Error saving decision cache: %s", e)
+            return False
+    
+    def _analysis_modes(self, frame: Optional[Frame]) -> Tuple[str, ...]:
+        """Analysis modes to try in order: vision when a screenshot is available, then text only"""
+        return ('vision', 'text') if frame else ('text',)
+    
+    def _analysis_request(self, mode: str, profile_text: str, frame: Optional[Frame]) -> Dict:
+        """Build chat completion arguments for an analysis mode"""
+        if mode == 'vision':
+            return self._vision_request(profile_text, frame)
+        return self._text_request(profile_text)
+    
+    def _vision_request(self, profile_text: str, frame: Frame) -> Dict:
+        """Build chat completion arguments for a vision analysis"""
+        # Encode the frame's already decoded image to base64
+        base64_image = _b64_image(frame.rgb)
+        
+        # Only the profile text varies per call; criteria live in the system prompt
+        prompt = VISION_PROMPT_TEMPLATE.format(profile_text=profile_text)
+        
+        return {
+            'model': self.vision_model,
+            'messages': [
+                {
+                    "role": "system", 
+                    "content": self._create_system_prompt()
+                },
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": prompt},
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": DATA_URI_PREFIX + base64_image
+                            }
+                        }
+                    ]
+                }
+            ],
+            'temperature': 0.7,
+            'max_tokens': 500
+        }
+    
+    def _text_request(self, profile_text: str) -> Dict:
+        """Build chat completion arguments for a text-only analysis"""
+        return {
+            'model': "gpt-4",
+            'messages': [
+                {"role": "system", "content": self._create_system_prompt()},
+                {"role": "user", "content": self._create_analysis_prompt(profile_text)}
+            ],
+            'temperature': 0.7,
+            'max_tokens': 500
+        }
+    
+    def _handle_analysis_response(self, response, cache_key: Optional[str], mode: str,
+                                  signature: Optional[Tuple[np.ndarray, bytes]] = None) -> ProfileDecision:
+        """Parse an analysis response and remember the decision and the frame it was made for"""
+        analysis_text = response.choices[0].message.content
+        decision = self._parse_ai_response(analysis_text)
+        self._remember_decision(cache_key, decision)
+        self._remember_frame(signature, cache_key)
+        
+        logger.info("Profile analysis (%s): %s (confidence: %.2f)", mode, decision.action, decision.confidence)
+        return decision
+    
+    def _create_system_prompt(self) -> str:
+        """Create the system prompt holding everything stable across profiles (enables prompt prefix caching)"""
+        return self._system_prompt
     
     def _create_analysis_prompt(self, profile_text: str) -> str:
         """Create prompt for AI analysis"""
-        criteria_text = json.dumps(self.criteria, indent=2)
-        
-        prompt = f"""
-Analyze this dating profile and make a matching decision based on the criteria below.
-
-PROFILE TEXT:
-{profile_text}
-
-MATCHING CRITERIA:
-{criteria_text}
-
-Please respond with a JSON object containing:
-1. "action": "like", "pass", or "comment"
-2. "confidence": float between 0.0 and 1.0
-3. "reason": brief explanation of the decision
-4. "comment": if action is "comment", provide a personalized, witty one-liner
-
-Guidelines:
-- Like profiles that match most criteria and seem compatible
-- Pass on profiles with deal-breakers or poor compatibility
-- Comment on profiles that are interesting but need a conversation starter
-- Be selective but not overly picky
-- Consider age, interests, and personality traits
-- Avoid generic or inappropriate comments
-
-Response format:
-{{
-    "action": "like|pass|comment",
-    "confidence": 0.85,
-    "reason": "Profile shows good compatibility with shared interests in technology and travel",
-    "comment": "Your travel photos look amazing! What's the most adventurous place you've been?"
-}}
-"""
-        return prompt
+        return ANALYSIS_PROMPT_TEMPLATE.format(profile_text=profile_text)
     
     def _parse_ai_response(self, response_text: str) -> ProfileDecision:
         """Parse AI response into ProfileDecision object"""
         try:
-            # Try to extract JSON from response
+            # Decode the first JSON object in the response, ignoring any surrounding text
             start_idx = response_text.find('{')
-            end_idx = response_text.rfind('}') + 1
-            
-            if start_idx != -1 and end_idx != -1:
-                json_str = response_text[start_idx:end_idx]
-                data = json.loads(json_str)
-                
-                return ProfileDecision(
-                    action=data.get('action', 'pass'),
-                    confidence=float(data.get('confidence', 0.5)),
-                    reason=data.get('reason', 'No reason provided'),
-                    comment=data.get('comment')
-                )
-            else:
-                # Fallback parsing
+            if start_idx == -1:
                 return self._parse_fallback_response(response_text)
+            
+            data, _ = _JSON_DECODER.raw_decode(response_text, start_idx)
+            
+            return ProfileDecision(
+                action=data.get('action', 'pass'),
+                confidence=float(data.get('confidence', 0.5)),
+                reason=data.get('reason', 'No reason provided'),
+                comment=data.get('comment')
+            )
                 
         except Exception as e:
-            logger.error(f"Error parsing AI response: {e}")
+            logger.error("Error parsing AI response: %s", e)
             return self._parse_fallback_response(response_text)
     
     def _parse_fallback_response(self, response_text: str) -> ProfileDecision:
@@ -263,19 +450,21 @@ Response format:
             # Simple keyword-based analysis
             text_lower = profile_text.lower()
             
-            # Check for deal breakers
-            deal_breakers = self.criteria.get('deal_breakers', [])
-            for breaker in deal_breakers:
-                if breaker.lower() in text_lower:
-                    return ProfileDecision(
-                        action='pass',
-                        confidence=0.9,
-                        reason=f"Deal breaker found: {breaker}"
-                    )
+            # Pre-lowercased keyword sets cached on the config
+            criteria_sets = self.config.get_matching_sets()
+            
+            # Check for deal breakers in a single scan of the text
+            deal_breaker_re = _keyword_pattern(criteria_sets['deal_breakers'])
+            match = deal_breaker_re.search(text_lower) if deal_breaker_re else None
+            if match:
+                return ProfileDecision(
+                    action='pass',
+                    confidence=0.9,
+                    reason=f"Deal breaker found: {match.group(0)}"
+                )
             
             # Check for preferred interests
-            interests = self.criteria.get('preferred_interests', [])
-            interest_matches = sum(1 for interest in interests if interest.lower() in text_lower)
+            interest_matches = sum(1 for interest in criteria_sets['preferred_interests'] if interest in text_lower)
             
             # Check for age (simple heuristic)
             age_match = self._check_age_match(profile_text)
@@ -302,7 +491,7 @@ Response format:
                 )
                 
         except Exception as e:
-            logger.error(f"Error in fallback analysis: {e}")
+            logger.error("Error in fallback analysis: %s", e)
             return ProfileDecision(
                 action='pass',
                 confidence=0.3,
@@ -312,18 +501,14 @@ Response format:
     def _check_age_match(self, profile_text: str) -> bool:
         """Check if age matches criteria"""
         try:
-            import re
-            
             # Extract age from text
-            age_pattern = r'\b(\d{2})\b'
-            ages = re.findall(age_pattern, profile_text)
+            ages = _AGE_RE.findall(profile_text)
             
             if not ages:
                 return True  # Assume match if no age found
             
             # Check if any age is in range
-            min_age = self.criteria.get('min_age', 21)
-            max_age = self.criteria.get('max_age', 35)
+            min_age, max_age = self._age_range
             
             for age_str in ages:
                 age = int(age_str)
@@ -333,7 +518,7 @@ Response format:
             return False
             
         except Exception as e:
-            logger.error(f"Error checking age: {e}")
+            logger.error("Error checking age: %s", e)
             return True  # Assume match on error
     
     def generate_comment(self, profile_text: str) -> str:
@@ -373,13 +558,15 @@ Generate just the comment, no explanation needed.
             return comment
             
         except Exception as e:
-            logger.error(f"Error generating comment: {e}")
+            logger.error("Error generating comment: %s", e)
             return "Hey! Your profile caught my attention 😊"
     
     def update_criteria(self, new_criteria: Dict) -> None:
         """Update matching criteria"""
         self.criteria.update(new_criteria)
-        logger.info("Matching criteria updated")
+        self._refresh_criteria_cache()
+        self._recent_frames.clear()
+        self.config.update_matching_criteria(self.criteria)
     
     def get_criteria(self) -> Dict:
         """Get current matching criteria"""
@@ -2,13 +2,45 @@
 Text Extractor - OCR module for extracting text from screenshots
 """
 
+import os
+import functools
 import pytesseract
 import logging
-from typing import Optional, List, Dict
+import numpy as np
+from dataclasses import dataclass
+from typing import Optional, Dict, Union
 from PIL import Image, ImageEnhance, ImageFilter
 
+try:
+    import cv2
+except ImportError:  # Fall back to the Pillow pipeline when OpenCV is unavailable
+    cv2 = None
+
 logger = logging.getLogger(__name__)
 
+# Single-character OCR misreads fixed by _clean_text
+_OCR_TRANSLATE = str.maketrans({'|': 'I'})
+
+
+@dataclass
+class OcrResult:
+    """OCR words as parallel arrays (one entry per recognized word)"""
+    text: np.ndarray  # object array of str
+    conf: np.ndarray  # int16 confidence, 0-100
+    left: np.ndarray  # int32 bounding box columns
+    top: np.ndarray
+    width: np.ndarray
+    height: np.ndarray
+    
+    @classmethod
+    def empty(cls) -> 'OcrResult':
+        """Result with no words"""
+        return cls(np.empty(0, dtype=object), np.empty(0, dtype=np.int16),
+                   *(np.empty(0, dtype=np.int32) for _ in range(4)))
+    
+    def __len__(self) -> int:
+        return len(self.text)
+
 
 class TextExtractor:
     """Extracts text from images using OCR"""
@@ -16,47 +48,56 @@ class TextExtractor:
     def __init__(self, config):
         self.config = config
         self.tesseract_config = self.config.get('tesseract_config', '--psm 6 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789.,!? ')
+        self.confidence_threshold = self.config.get('ocr_confidence_threshold', 30)
+        
+        # Preprocessed screenshots keyed by (path, mtime) so each file is decoded once
+        self._preprocess_cached = functools.lru_cache(maxsize=4)(self._load_and_preprocess_uncached)
         
-    def extract_text(self, image_path: str, region: Optional[tuple] = None) -> str:
-        """Extract text from image or image region"""
+    def extract_text(self, image: Union[str, Image.Image], region: Optional[tuple] = None) -> str:
+        """Extract text from image or image region (a path, or an image already decoded in memory)"""
         try:
-            # Load image with PIL
-            image = Image.open(image_path)
-            if image is None:
-                logger.error(f"Could not load image: {image_path}")
-                return ""
-            
-            # Crop to region if specified
-            if region:
-                x, y, w, h = region
-                image = image.crop((x, y, x + w, y + h))
-            
-            # Preprocess image for better OCR
-            processed_image = self._preprocess_image(image)
-            
-            # Extract text using Tesseract
-            text = pytesseract.image_to_string(processed_image, config=self.tesseract_config)
-            
-            # Clean up text
-            cleaned_text = self._clean_text(text)
-            
-            logger.debug(f"Extracted text: {cleaned_text[:100]}...")
-            return cleaned_text
+            if isinstance(image, Image.Image):
+                processed_image = self._preprocess_image(image)
+            else:
+                processed_image = self._load_and_preprocess(image)
+            return self._extract_text_from_pil(processed_image, region)
             
         except Exception as e:
-            logger.error(f"Error extracting text: {e}")
+            logger.error("Error extracting text: %s", e)
             return ""
     
+    def _load_and_preprocess(self, image_path: str) -> Image.Image:
+        """Load and preprocess a screenshot, reusing the result while the file is unchanged"""
+        return self._preprocess_cached(image_path, os.path.getmtime(image_path))
+    
+    def _load_and_preprocess_uncached(self, image_path: str, mtime: float) -> Image.Image:
+        """Load and preprocess a screenshot (mtime is only part of the cache key)"""
+        return self._preprocess_image(Image.open(image_path))
+    
+    def _extract_text_from_pil(self, processed_image: Image.Image, region: Optional[tuple] = None) -> str:
+        """Extract text from a region of an already preprocessed image"""
+        # Crop to region if specified
+        if region:
+            x, y, w, h = region
+            processed_image = self._upscale_if_small(processed_image.crop((x, y, x + w, y + h)))
+        
+        # Extract text using Tesseract
+        text = pytesseract.image_to_string(processed_image, config=self.tesseract_config)
+        
+        # Clean up text
+        cleaned_text = self._clean_text(text)
+        
+        logger.debug("Extracted text: %s...", cleaned_text[:100])
+        return cleaned_text
+    
     def extract_profile_info(self, image_path: str) -> Dict[str, str]:
         """Extract structured profile information"""
         try:
-            # Load image with PIL
-            image = Image.open(image_path)
-            if image is None:
-                return {}
+            # Decode and preprocess once; each region is a cheap crop
+            processed_image = self._load_and_preprocess(image_path)
             
             # Get image dimensions
-            width, height = image.size
+            width, height = processed_image.size
             
             # Define regions for different profile elements
             regions = {
@@ -66,20 +107,53 @@ class TextExtractor:
                 'prompts': (0, height // 2, width, height // 2)  # Bottom half
             }
             
+            # OCR the whole image once, then assign each word to the regions containing its center
+            words = self._ocr_words(processed_image, self.tesseract_config)
+            center_x = words.left + words.width / 2
+            center_y = words.top + words.height / 2
+            
+            region_words = {}
+            for field, (x, y, region_w, region_h) in regions.items():
+                inside = ((center_x >= x) & (center_x < x + region_w) &
+                          (center_y >= y) & (center_y < y + region_h))
+                region_words[field] = words.text[inside]
+            
             profile_info = {}
             
-            for field, region in regions.items():
-                text = self.extract_text(image_path, region)
+            for field, field_words in region_words.items():
+                text = self._clean_text(' '.join(field_words))
                 if text.strip():
                     profile_info[field] = text.strip()
             
             return profile_info
             
         except Exception as e:
-            logger.error(f"Error extracting profile info: {e}")
+            logger.error("Error extracting profile info: %s", e)
             return {}
     
     def _preprocess_image(self, image: Image.Image) -> Image.Image:
+        """Preprocess image for better OCR results in a single OpenCV pass"""
+        if cv2 is None:
+            return self._preprocess_image_pil(image)
+        
+        try:
+            # Convert to grayscale
+            gray = np.asarray(image if image.mode == 'L' else image.convert('L'))
+            
+            # Enhance contrast around the mean, matching ImageEnhance.Contrast(2.0)
+            mean = float(gray.mean())
+            enhanced = cv2.addWeighted(gray, 2.0, gray, 0.0, -mean)
+            
+            # Apply slight blur to reduce noise
+            blurred = cv2.GaussianBlur(enhanced, (3, 3), 0.5)
+            
+            return self._upscale_if_small(Image.fromarray(blurred))
+            
+        except Exception as e:
+            logger.error("Error preprocessing image with OpenCV: %s", e)
+            return self._preprocess_image_pil(image)
+    
+    def _preprocess_image_pil(self, image: Image.Image) -> Image.Image:
         """Preprocess image for better OCR results using PIL"""
         try:
             # Convert to grayscale
@@ -95,29 +169,27 @@ class TextExtractor:
             # Apply slight blur to reduce noise
             blurred = enhanced.filter(ImageFilter.GaussianBlur(radius=0.5))
             
-            # Resize image for better OCR (if too small)
-            width, height = blurred.size
-            if height < 100 or width < 100:
-                scale_factor = max(100 / height, 100 / width)
-                new_height = int(height * scale_factor)
-                new_width = int(width * scale_factor)
-                blurred = blurred.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            return blurred
+            return self._upscale_if_small(blurred)
             
         except Exception as e:
-            logger.error(f"Error preprocessing image: {e}")
+            logger.error("Error preprocessing image: %s", e)
             return image
     
+    def _upscale_if_small(self, image: Image.Image) -> Image.Image:
+        """Resize image for better OCR (if too small)"""
+        width, height = image.size
+        if height < 100 or width < 100:
+            scale_factor = max(100 / height, 100 / width)
+            new_height = int(height * scale_factor)
+            new_width = int(width * scale_factor)
+            image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        return image
+    
     def _clean_text(self, text: str) -> str:
         """Clean and normalize extracted text"""
         try:
-            # Remove extra whitespace
-            text = ' '.join(text.split())
-            
-            # Remove common OCR artifacts
-            text = text.replace('|', 'I')
-            text = text.replace('0', 'O')  # Sometimes numbers are misread
+            # Remove extra whitespace and common OCR artifacts (digits are kept for age parsing)
+            text = ' '.join(text.split()).translate(_OCR_TRANSLATE)
             
             # Remove empty lines
             lines = [line.strip() for line in text.split('\n') if line.strip()]
@@ -125,46 +197,39 @@ class TextExtractor:
             return '\n'.join(lines)
             
         except Exception as e:
-            logger.error(f"Error cleaning text: {e}")
+            logger.error("Error cleaning text: %s", e)
             return text
     
-    def extract_text_with_confidence(self, image_path: str) -> List[Dict[str, any]]:
+    def _ocr_words(self, processed_image: Image.Image, config: str = '') -> OcrResult:
+        """Run Tesseract once and keep the confident, non-empty words"""
+        data = pytesseract.image_to_data(processed_image, output_type=pytesseract.Output.DICT, config=config)
+        
+        conf = np.asarray(data['conf'], dtype=np.float32).astype(np.int16)
+        text = np.array([word.strip() for word in data['text']], dtype=object)
+        
+        # Filter out low confidence results
+        keep = (conf > self.confidence_threshold) & (text != '')
+        return OcrResult(
+            text=text[keep],
+            conf=conf[keep],
+            left=np.asarray(data['left'], dtype=np.int32)[keep],
+            top=np.asarray(data['top'], dtype=np.int32)[keep],
+            width=np.asarray(data['width'], dtype=np.int32)[keep],
+            height=np.asarray(data['height'], dtype=np.int32)[keep]
+        )
+    
+    def extract_text_with_confidence(self, image_path: str) -> OcrResult:
         """Extract text with confidence scores"""
         try:
-            # Load image with PIL
-            image = Image.open(image_path)
-            if image is None:
-                return []
-            
-            # Preprocess image
-            processed_image = self._preprocess_image(image)
+            # Load and preprocess image
+            processed_image = self._load_and_preprocess(image_path)
             
             # Get detailed OCR data
-            data = pytesseract.image_to_data(processed_image, output_type=pytesseract.Output.DICT)
-            
-            # Filter out low confidence results
-            results = []
-            for i in range(len(data['text'])):
-                confidence = int(data['conf'][i])
-                text = data['text'][i].strip()
-                
-                if confidence > 30 and text:  # Minimum confidence threshold
-                    results.append({
-                        'text': text,
-                        'confidence': confidence,
-                        'bbox': {
-                            'x': data['left'][i],
-                            'y': data['top'][i],
-                            'width': data['width'][i],
-                            'height': data['height'][i]
-                        }
-                    })
-            
-            return results
+            return self._ocr_words(processed_image)
             
         except Exception as e:
-            logger.error(f"Error extracting text with confidence: {e}")
-            return []
+            logger.error("Error extracting text with confidence: %s", e)
+            return OcrResult.empty()
     
     def is_text_region(self, image_path: str, region: tuple) -> bool:
         """Check if a region contains significant text"""
@@ -174,5 +239,5 @@ class TextExtractor:
             return len(text.strip()) > 10
             
         except Exception as e:
-            logger.error(f"Error checking text region: {e}")
+            logger.error("Error checking text region: %s", e)
             return False
@@ -2,24 +2,117 @@
 UI Detector - AI vision module for detecting UI elements
 """
 
-import base64
-import openai
+from __future__ import annotations
+
+import os
+import re
+import time
+import json
+import struct
 import logging
-from typing import Optional, List, Tuple, Dict
+import numpy as np
+from typing import Any, Optional, List, Tuple, Dict, Union
 from PIL import Image
 import io
+from collections import OrderedDict
+from dataclasses import dataclass
+from .openai_clients import (
+    get_openai_client, get_async_openai_client, encode_base64, VISION_MAX_SIZE, DATA_URI_PREFIX
+)
+from .local_detector import load_local_detector
+from .frame import Frame, Screenshot
+
+try:
+    import cv2
+except ImportError:  # Fall back to Pillow resizing and encoding when OpenCV is unavailable
+    cv2 = None
 
 logger = logging.getLogger(__name__)
 
+# Controls located by UIDetector.find_controls
+CONTROL_TYPES = ('like', 'pass', 'comment', 'text_input', 'send')
+
+# Controls that resolve a profile screen on-device, and the ones only a comment needs
+SWIPE_CONTROLS = ('like', 'pass')
+COMMENT_CONTROLS = ('comment', 'text_input', 'send')
+
+# Coordinate fields of a screen analysis and their lengths ([x, y] points, [x, y, w, h] box)
+SCREEN_FIELDS = tuple((control_type, 2) for control_type in CONTROL_TYPES) + (('text_region', 4),)
+
+# Comma separated points and boxes, as in "540, 1800" or "0,1200,1080,1200"
+_NUM = r"(-?\d+(?:\.\d+)?)"
+_COORD_RE = re.compile(rf"{_NUM}\s*,\s*{_NUM}")
+_BBOX_RE = re.compile(rf"{_NUM}\s*,\s*{_NUM}\s*,\s*{_NUM}\s*,\s*{_NUM}")
+
+# First bytes of every PNG file (ADB screencaps are PNG)
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# Screenshot files whose (path, mtime, size) -> content digest is remembered, so repeated
+# detections on an unchanged file skip rereading and rehashing it
+PATH_DIGEST_CACHE_SIZE = 64
+
+# Batch API statuses after which a batch will not progress further
+BATCH_FINAL_STATES = ('completed', 'failed', 'expired', 'cancelled')
+
+# JPEG quality of screenshots sent to the vision model
+VISION_JPEG_QUALITY = 75
+
+# Single prompt answering every detection for a screenshot
+SCREEN_PROMPT = """
+Analyze this screenshot from a mobile dating app (likely Hinge) and report:
+- is_profile: true if this is a profile screen showing a person's dating profile
+  (photos, like/pass buttons, profile text, name and age), otherwise false
+- like: the LIKE button (usually a heart icon, thumbs up, or green button)
+- pass: the PASS button (usually an X icon, thumbs down, or red button)
+- comment: the COMMENT button (usually a chat bubble or comment icon)
+- text_input: the text input field (usually a text box or input area)
+- send: the SEND button (usually says 'Send' or has a send icon)
+- text_region: the bounding box of the profile text (name and age, bio, prompts and answers)
+
+Button and field coordinates should be the center point as [x, y]; the text region
+is [x, y, width, height]. Use null for anything not found.
+Respond with only a JSON object:
+{"is_profile": true, "like": [x, y], "pass": [x, y], "comment": [x, y], "text_input": [x, y], "send": [x, y], "text_region": [x, y, width, height]}
+"""
+
+
+@dataclass
+class _ScreenJob:
+    """A screen analysis waiting on the AI: frame digest, request, upload scale and on-device control hits"""
+    digest: bytes
+    request: Dict[str, Any]
+    scale: float
+    local: Dict[str, Tuple[int, int]]
+
 
 class UIDetector:
     """Detects UI elements using AI vision"""
     
     def __init__(self, config):
         self.config = config
+        self.vision_model = self.config.get('vision_model', 'gpt-4o-mini')
         self.openai_client = None
+        self.async_openai_client = None
         self._setup_openai()
         
+        # Bounded LRU of screen analyses keyed by screenshot content hash
+        self._screen_cache = OrderedDict()
+        self._screen_cache_size = self.config.get('screen_cache_size', 128)
+        self._path_digests = OrderedDict()
+        
+        # Fallback screen analyses keyed by screenshot (width, height)
+        self._fallback_layouts = {}
+        
+        # Reused OpenCV output buffers for the downscaled upload (the device resolution is fixed)
+        self._small_rgb = None
+        self._small_bgr = None
+        
+        # Optional on-device control detector tried before AI vision
+        self.local_detector = load_local_detector(
+            self.config.get('local_detector_model'),
+            self.config.get('local_detector_confidence', 0.6)
+        )
+        
     def _setup_openai(self) -> None:
         """Setup OpenAI client"""
         try:
@@ -28,268 +121,464 @@ class UIDetector:
                 logger.error("OpenAI API key not found in configuration")
                 return
             
-            self.openai_client = openai.OpenAI(api_key=api_key)
+            self.openai_client = get_openai_client(api_key)
+            self.async_openai_client = get_async_openai_client(api_key)
             logger.info("OpenAI client initialized for UI detection")
             
         except Exception as e:
             logger.error(f"Failed to setup OpenAI client: {e}")
     
-    def is_profile_screen(self, screenshot_path: str) -> bool:
-        """Check if current screen is a profile screen using AI vision"""
+    def analyze_screen(self, screenshot_path: Screenshot) -> Dict[str, Any]:
+        """Detect the screen type, controls and profile text region in a single AI vision pass"""
+        job = self._start_screen(screenshot_path, self.openai_client)
+        if isinstance(job, dict):
+            return job
+        
+        try:
+            response = self.openai_client.chat.completions.create(**job.request)
+        except Exception as e:
+            return self._screen_unavailable(e)
+        return self._finish_screen(job, response)
+    
+    async def analyze_screen_async(self, screenshot_path: Screenshot) -> Dict[str, Any]:
+        """Detect the screen type, controls and profile text region without blocking the event loop"""
+        job = self._start_screen(screenshot_path, self.async_openai_client)
+        if isinstance(job, dict):
+            return job
+        
+        try:
+            response = await self.async_openai_client.chat.completions.create(**job.request)
+        except Exception as e:
+            return self._screen_unavailable(e)
+        return self._finish_screen(job, response)
+    
+    def _start_screen(self, screenshot: Screenshot, client) -> Union[Dict[str, Any], _ScreenJob]:
+        """Answer a screen analysis without the API if possible, otherwise return the request to send"""
+        frame = Frame.of(screenshot)
+        try:
+            digest = self._frame_digest(frame)
+        except Exception as e:
+            logger.error(f"Error reading screenshot: {e}")
+            return {'is_profile': False}
+        
+        # Identical frames (and every detection on the same frame) are answered from one request
+        cached = self._cached_screen(digest)
+        if cached is not None:
+            return cached
+        
+        # Confident on-device like and pass hits answer without a network round trip; the comment
+        # controls are looked up with AI vision only if a comment needs them (see find_controls)
+        local = self._detect_locally(frame)
+        if all(control_type in local for control_type in SWIPE_CONTROLS):
+            logger.debug(f"Local screen detection: {local}")
+            return self._remember_screen(digest, {'is_profile': True, 'source': 'local', **local})
+        
+        if not client:
+            logger.warning("OpenAI client not available, using fallback detection")
+            return self._remember_screen(digest, {**self._fallback_screen(frame), **local})
+        
+        prepared = self._screen_request(frame)
+        if not prepared:
+            return self._remember_screen(digest, {'is_profile': False})
+        
+        request, scale = prepared
+        return _ScreenJob(digest, request, scale, local)
+    
+    def _finish_screen(self, job: _ScreenJob, response) -> Dict[str, Any]:
+        """Parse the API response to a screen analysis request and cache the result"""
+        try:
+            analysis = self._handle_screen_response(response, job.scale)
+        except Exception as e:
+            return self._screen_unavailable(e)
+        
+        # On-device hits are more precise than the vision model's coordinate estimates
+        analysis.update(job.local)
+        return self._remember_screen(job.digest, analysis)
+    
+    def _screen_unavailable(self, error: Exception) -> Dict[str, Any]:
+        """Report a failed AI screen analysis as not a profile, without caching it"""
+        # Retries are exhausted or the reply is unusable; guessed fallback positions could tap the wrong control
+        logger.error(f"AI screen analysis unavailable: {error}")
+        return {'is_profile': False}
+    
+    def _frame_digest(self, frame: Frame) -> bytes:
+        """Content digest of a frame; an unchanged screenshot file is recognised from its stat alone"""
+        if frame.path is None or frame.raw is not None:
+            return frame.sha256
+        
+        stat = os.stat(frame.path)
+        key = (frame.path, stat.st_mtime_ns, stat.st_size)
+        digest = self._path_digests.get(key)
+        if digest is None:
+            digest = frame.sha256
+            self._path_digests[key] = digest
+            while len(self._path_digests) > PATH_DIGEST_CACHE_SIZE:
+                self._path_digests.popitem(last=False)
+        else:
+            self._path_digests.move_to_end(key)
+        return digest
+    
+    def _cached_screen(self, digest: bytes) -> Optional[Dict[str, Any]]:
+        """Look up the analysis of an identical earlier frame"""
+        cached = self._screen_cache.get(digest)
+        if cached is not None:
+            self._screen_cache.move_to_end(digest)
+        return cached
+    
+    def _remember_screen(self, digest: bytes, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """Store a screen analysis in the bounded screen cache, returning it"""
+        self._screen_cache[digest] = analysis
+        while len(self._screen_cache) > self._screen_cache_size:
+            self._screen_cache.popitem(last=False)
+        return analysis
+    
+    def _detect_locally(self, frame: Frame) -> Dict[str, Tuple[int, int]]:
+        """Controls the local detector finds confidently, empty if it is unavailable or fails"""
+        if not self.local_detector:
+            return {}
+        
+        try:
+            return self.local_detector.detect(frame.rgb)
+        except Exception as e:
+            logger.error(f"Error in local screen detection: {e}")
+            return {}
+    
+    def _screen_request(self, frame: Frame) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Build chat completion arguments for a screen analysis and the screenshot/upload scale factor"""
+        # Encode a downscaled copy of the image to base64
+        encoded = self._encode_image_to_base64(frame)
+        if not encoded:
+            return None
+        base64_image, (width, height), scale = encoded
+        
+        prompt = SCREEN_PROMPT + f"The image is {width}x{height} pixels.\n"
+        return self._vision_request(prompt, base64_image, max_tokens=150), scale
+    
+    def _vision_request(self, prompt: str, base64_image: str, max_tokens: int) -> Dict[str, Any]:
+        """Build chat completion arguments for a prompt about one JPEG image; model settings live here"""
+        return {
+            'model': self.vision_model,
+            'messages': [
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": prompt},
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": DATA_URI_PREFIX + base64_image,
+                                "detail": "low"
+                            }
+                        }
+                    ]
+                }
+            ],
+            'temperature': 0,
+            'response_format': {"type": "json_object"},
+            'max_tokens': max_tokens
+        }
+    
+    def _handle_screen_response(self, response, scale: float = 1.0) -> Dict[str, Any]:
+        """Parse a screen analysis response, mapping coordinates back to screenshot pixels"""
+        return self._screen_from_reply(response.choices[0].message.content, scale)
+    
+    def _screen_from_reply(self, reply: str, scale: float = 1.0) -> Dict[str, Any]:
+        """Parse the text of a screen analysis reply, mapping coordinates back to screenshot pixels"""
+        result = reply.strip()
+        analysis = self._parse_screen(result)
+        
+        if scale != 1.0:
+            for key, _ in SCREEN_FIELDS:
+                if analysis.get(key):
+                    analysis[key] = tuple(int(v * scale) for v in analysis[key])
+        
+        logger.debug(f"AI screen analysis: {analysis}")
+        return analysis
+    
+    def analyze_batch(self, screenshot_paths: List[str], poll_interval: float = 30.0) -> Dict[str, Dict[str, Any]]:
+        """Analyze many screenshots offline through the OpenAI Batch API (half price, completes within 24h)"""
+        results = {}
         try:
             if not self.openai_client:
                 logger.warning("OpenAI client not available, using fallback detection")
-                return self._fallback_profile_detection(screenshot_path)
+                return {path: self._fallback_screen(Frame.of(path)) for path in screenshot_paths}
             
-            # Encode image to base64
-            base64_image = self._encode_image_to_base64(screenshot_path)
-            if not base64_image:
-                return False
+            # One request line per screenshot not already analyzed
+            lines = []
+            pending = {}
+            for path in dict.fromkeys(screenshot_paths):
+                try:
+                    frame = Frame.of(path)
+                    digest = self._frame_digest(frame)
+                    cached = self._cached_screen(digest)
+                    if cached is not None:
+                        results[path] = cached
+                        continue
+                    
+                    prepared = self._screen_request(frame)
+                    if not prepared:
+                        results[path] = {'is_profile': False}
+                        continue
+                    
+                    request, scale = prepared
+                    lines.append(json.dumps({
+                        "custom_id": path,
+                        "method": "POST",
+                        "url": "/v1/chat/completions",
+                        "body": request
+                    }))
+                    pending[path] = (digest, scale)
+                    
+                except Exception as e:
+                    # One unreadable screenshot does not hold back the rest of the batch
+                    logger.error(f"Error preparing {path} for batch analysis: {e}")
             
-            # Create prompt for AI vision
-            prompt = """
-            Analyze this screenshot from a mobile dating app (likely Hinge). 
-            Determine if this is a profile screen showing a person's dating profile.
+            if not lines:
+                return results
             
-            Look for these indicators:
-            - A person's photo(s)
-            - Like/Pass buttons (usually heart/X or thumbs up/down)
-            - Profile text/bio information
-            - Name and age
-            - Dating app interface elements
+            batch_file = self.openai_client.files.create(
+                file=("screen_analysis.jsonl", "\n".join(lines).encode('utf-8')),
+                purpose="batch"
+            )
+            batch = self.openai_client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+            logger.info(f"Submitted batch {batch.id} with {len(lines)} screenshots")
             
-            Respond with only "YES" if this is a profile screen, or "NO" if it's not.
-            """
+            # Wait for the batch to finish
+            while batch.status not in BATCH_FINAL_STATES:
+                time.sleep(poll_interval)
+                batch = self.openai_client.batches.retrieve(batch.id)
             
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4-vision-preview",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=10
-            )
+            if batch.status != "completed" or not batch.output_file_id:
+                logger.error(f"Batch {batch.id} ended with status {batch.status}")
+                return results
             
-            result = response.choices[0].message.content.strip().upper()
-            is_profile = result == "YES"
+            # Parse results back into the same shape as live analyses
+            output = self.openai_client.files.content(batch.output_file_id).text
+            for line in output.splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    item = json.loads(line)
+                    path = item.get("custom_id")
+                    if path not in pending:
+                        continue
+                    
+                    response = item.get("response") or {}
+                    if item.get("error") or response.get("status_code") != 200:
+                        logger.error(f"Batch analysis failed for {path}: {item.get('error') or response.get('status_code')}")
+                        continue
+                    
+                    digest, scale = pending[path]
+                    analysis = self._screen_from_reply(response["body"]["choices"][0]["message"]["content"], scale)
+                    results[path] = self._remember_screen(digest, analysis)
+                    
+                except Exception as e:
+                    # A malformed line loses only its own result, not the rest of the paid batch
+                    logger.error(f"Error parsing batch output line: {e}")
             
-            logger.debug(f"AI profile screen detection: {result}")
-            return is_profile
+            logger.info(f"Batch {batch.id} analyzed {len(results)} screenshots")
+            return results
             
         except Exception as e:
-            logger.error(f"Error in AI profile screen detection: {e}")
-            return self._fallback_profile_detection(screenshot_path)
+            logger.error(f"Error in batch screen analysis: {e}")
+            return results
+    
+    def is_profile_screen(self, screenshot_path: Screenshot) -> bool:
+        """Check if current screen is a profile screen using AI vision"""
+        return self.analyze_screen(screenshot_path).get('is_profile', False)
     
-    def find_like_button(self, screenshot_path: str) -> Optional[Tuple[int, int]]:
+    def find_like_button(self, screenshot_path: Screenshot) -> Optional[Tuple[int, int]]:
         """Find the like button coordinates using AI vision"""
-        return self._find_button_ai(screenshot_path, 'like')
+        return self.analyze_screen(screenshot_path).get('like')
     
-    def find_pass_button(self, screenshot_path: str) -> Optional[Tuple[int, int]]:
+    def find_pass_button(self, screenshot_path: Screenshot) -> Optional[Tuple[int, int]]:
         """Find the pass button coordinates using AI vision"""
-        return self._find_button_ai(screenshot_path, 'pass')
+        return self.analyze_screen(screenshot_path).get('pass')
     
-    def find_comment_button(self, screenshot_path: str) -> Optional[Tuple[int, int]]:
+    def find_comment_button(self, screenshot_path: Screenshot) -> Optional[Tuple[int, int]]:
         """Find the comment button coordinates using AI vision"""
-        return self._find_button_ai(screenshot_path, 'comment')
+        return self.analyze_screen(screenshot_path).get('comment')
     
-    def find_send_button(self, screenshot_path: str) -> Optional[Tuple[int, int]]:
+    def find_send_button(self, screenshot_path: Screenshot) -> Optional[Tuple[int, int]]:
         """Find the send button coordinates using AI vision"""
-        return self._find_button_ai(screenshot_path, 'send')
+        return self.analyze_screen(screenshot_path).get('send')
     
-    def find_text_input(self, screenshot_path: str) -> Optional[Tuple[int, int]]:
+    def find_text_input(self, screenshot_path: Screenshot) -> Optional[Tuple[int, int]]:
         """Find text input field coordinates using AI vision"""
-        return self._find_button_ai(screenshot_path, 'text_input')
+        return self.analyze_screen(screenshot_path).get('text_input')
     
-    def _find_button_ai(self, screenshot_path: str, button_type: str) -> Optional[Tuple[int, int]]:
-        """Find button coordinates using AI vision"""
+    def find_controls(self, screenshot_path: Screenshot,
+                      required: Tuple[str, ...] = ()) -> Dict[str, Optional[Tuple[int, int]]]:
+        """Find all interaction controls in a single pass, asking AI vision for required ones missing on-device"""
+        analysis = self.analyze_screen(screenshot_path)
+        if analysis.get('source') == 'local' and any(control_type not in analysis for control_type in required):
+            analysis = self._complete_local_screen(screenshot_path, analysis)
+        return {control_type: analysis[control_type] for control_type in CONTROL_TYPES if control_type in analysis}
+    
+    def _complete_local_screen(self, screenshot: Screenshot, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """Run AI vision on a screen resolved on-device, keeping the on-device hits; unchanged if vision fails"""
+        if not self.openai_client:
+            return analysis
+        
+        frame = Frame.of(screenshot)
         try:
-            if not self.openai_client:
-                logger.warning("OpenAI client not available, using fallback detection")
-                return self._fallback_button_detection(screenshot_path, button_type)
-            
-            # Encode image to base64
-            base64_image = self._encode_image_to_base64(screenshot_path)
-            if not base64_image:
-                return None
-            
-            # Create button-specific prompts
-            button_prompts = {
-                'like': "Find the LIKE button (usually a heart icon, thumbs up, or green button). Return coordinates as 'x,y' or 'NOT_FOUND'.",
-                'pass': "Find the PASS button (usually an X icon, thumbs down, or red button). Return coordinates as 'x,y' or 'NOT_FOUND'.",
-                'comment': "Find the COMMENT button (usually a chat bubble or comment icon). Return coordinates as 'x,y' or 'NOT_FOUND'.",
-                'send': "Find the SEND button (usually says 'Send' or has a send icon). Return coordinates as 'x,y' or 'NOT_FOUND'.",
-                'text_input': "Find the text input field (usually a text box or input area). Return coordinates as 'x,y' or 'NOT_FOUND'."
-            }
-            
-            prompt = f"""
-            Analyze this mobile app screenshot and {button_prompts.get(button_type, f"find the {button_type} button")}
-            
-            The coordinates should be the center point of the button/field.
-            Only respond with the coordinates in format 'x,y' or 'NOT_FOUND' if not found.
-            """
-            
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4-vision-preview",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=20
-            )
-            
-            result = response.choices[0].message.content.strip()
-            
-            if result == "NOT_FOUND":
-                logger.debug(f"AI could not find {button_type} button")
-                return None
-            
-            # Parse coordinates
-            try:
-                x, y = map(int, result.split(','))
-                logger.debug(f"AI found {button_type} button at ({x}, {y})")
-                return (x, y)
-            except ValueError:
-                logger.error(f"Invalid coordinate format from AI: {result}")
-                return None
+            digest = self._frame_digest(frame)
+            prepared = self._screen_request(frame)
+            if not prepared:
+                return analysis
             
+            request, scale = prepared
+            response = self.openai_client.chat.completions.create(**request)
+            completed = self._handle_screen_response(response, scale)
         except Exception as e:
-            logger.error(f"Error in AI button detection for {button_type}: {e}")
-            return self._fallback_button_detection(screenshot_path, button_type)
+            # Never fall back to guessed positions; the comment flow stops at the missing control instead
+            logger.error(f"AI screen analysis unavailable, keeping on-device controls: {e}")
+            return analysis
+        
+        completed.update({control_type: analysis[control_type] for control_type in CONTROL_TYPES
+                          if control_type in analysis})
+        return self._remember_screen(digest, completed)
+    
+    def find_profile_text_region(self, screenshot_path: Screenshot) -> Optional[Tuple[int, int, int, int]]:
+        """Find the region containing profile text using AI vision"""
+        return self.analyze_screen(screenshot_path).get('text_region')
     
-    def _encode_image_to_base64(self, image_path: str) -> Optional[str]:
-        """Encode image to base64 for AI vision API"""
+    def _parse_screen(self, result: str) -> Dict[str, Any]:
+        """Parse the JSON screen analysis returned by the AI; unparseable entries are omitted"""
+        start_idx = result.find('{')
+        end_idx = result.rfind('}') + 1
+        if start_idx == -1 or end_idx == 0:
+            logger.error(f"Invalid screen analysis format from AI: {result}")
+            return {'is_profile': False}
+        
         try:
-            with open(image_path, "rb") as image_file:
-                return base64.b64encode(image_file.read()).decode('utf-8')
-        except Exception as e:
-            logger.error(f"Error encoding image to base64: {e}")
-            return None
+            data = json.loads(result[start_idx:end_idx])
+        except ValueError:
+            logger.error(f"Invalid screen analysis format from AI: {result}")
+            return {'is_profile': False}
+        
+        analysis = {'is_profile': data.get('is_profile') is True}
+        for key, size in SCREEN_FIELDS:
+            if key not in data:
+                continue
+            value = data[key]
+            if value is None:
+                analysis[key] = None
+                continue
+            coords = self._parse_coords(value, size)
+            if coords:
+                analysis[key] = coords
+            else:
+                logger.error(f"Invalid coordinates for {key} from AI: {value}")
+        
+        return analysis
+    
+    def _parse_coords(self, value: Any, size: int) -> Optional[tuple]:
+        """Read an [x, y] point (size 2) or [x, y, w, h] box (size 4) given as a list or an 'x,y' style string"""
+        pattern = _BBOX_RE if size == 4 else _COORD_RE
+        if isinstance(value, str):
+            match = pattern.search(value)
+        elif isinstance(value, (list, tuple)):
+            match = pattern.fullmatch(','.join(map(str, value)))
+        else:
+            match = None
+        return tuple(int(float(group)) for group in match.groups()) if match else None
     
-    def _fallback_profile_detection(self, screenshot_path: str) -> bool:
-        """Fallback profile detection when AI is not available"""
+    def _fallback_screen(self, frame: Frame) -> Dict[str, Any]:
+        """Fallback screen analysis from the screenshot size when AI is not available"""
         try:
-            # Simple heuristic: check if image exists and has reasonable size
-            with Image.open(screenshot_path) as img:
-                width, height = img.size
-                # Assume profile screens are portrait orientation
-                return height > width and height > 1000
+            width, height = self._image_size(frame)
         except Exception as e:
-            logger.error(f"Error in fallback profile detection: {e}")
-            return False
+            logger.error(f"Error in fallback screen detection: {e}")
+            return {'is_profile': False}
+        
+        # The device resolution is fixed, so the layout is computed once per size
+        layout = self._fallback_layouts.get((width, height))
+        if layout is None:
+            layout = {
+                control_type: self._fallback_button_position(width, height, control_type)
+                for control_type in CONTROL_TYPES
+            }
+            # Assume profile screens are portrait orientation, with the text in the bottom half
+            layout['is_profile'] = height > width and height > 1000
+            layout['text_region'] = (0, height // 2, width, height // 2)
+            self._fallback_layouts[(width, height)] = layout
+        return dict(layout)
     
-    def _fallback_button_detection(self, screenshot_path: str, button_type: str) -> Optional[Tuple[int, int]]:
-        """Fallback button detection when AI is not available"""
+    def _encode_image_to_base64(self, frame: Frame) -> Optional[Tuple[str, Tuple[int, int], float]]:
+        """Downscale image to JPEG and encode it to base64 for AI vision API
+        
+        Returns the base64 data, the uploaded size and the factor mapping uploaded pixels back to the screenshot.
+        """
+        if frame.encoded is not None:
+            return frame.encoded
         try:
-            with Image.open(screenshot_path) as img:
-                width, height = img.size
-                
-                # Simple heuristic positioning based on common UI patterns
-                if button_type == 'like':
-                    # Like button usually bottom right
-                    return (int(width * 0.8), int(height * 0.9))
-                elif button_type == 'pass':
-                    # Pass button usually bottom left
-                    return (int(width * 0.2), int(height * 0.9))
-                elif button_type == 'comment':
-                    # Comment button usually center bottom
-                    return (int(width * 0.5), int(height * 0.9))
-                elif button_type == 'send':
-                    # Send button usually bottom right
-                    return (int(width * 0.8), int(height * 0.9))
-                elif button_type == 'text_input':
-                    # Text input usually center bottom
-                    return (int(width * 0.5), int(height * 0.85))
-                
-                return None
+            width, height = frame.rgb.size
+            ratio = min(1.0, VISION_MAX_SIZE / max(width, height))
+            size = (max(1, round(width * ratio)), max(1, round(height * ratio)))
+            jpeg = self._downscale_jpeg(frame.rgb, size)
+            frame.encoded = (encode_base64(jpeg), size, width / size[0])
+            return frame.encoded
         except Exception as e:
-            logger.error(f"Error in fallback button detection: {e}")
+            logger.error(f"Error encoding image to base64: {e}")
             return None
     
-    def find_profile_text_region(self, screenshot_path: str) -> Optional[Tuple[int, int, int, int]]:
-        """Find the region containing profile text using AI vision"""
-        try:
-            if not self.openai_client:
-                # Fallback to simple heuristic
-                with Image.open(screenshot_path) as img:
-                    width, height = img.size
-                    return (0, height // 2, width, height // 2)
-            
-            # Encode image to base64
-            base64_image = self._encode_image_to_base64(screenshot_path)
-            if not base64_image:
-                return None
-            
-            prompt = """
-            Analyze this mobile app screenshot and find the region containing profile text/bio information.
-            Look for text areas that contain:
-            - Name and age
-            - Bio/description text
-            - Profile prompts and answers
-            
-            Return the coordinates as 'x,y,width,height' representing the bounding box of the text region.
-            If no text region is found, return 'NOT_FOUND'.
-            """
-            
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4-vision-preview",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=30
-            )
-            
-            result = response.choices[0].message.content.strip()
-            
-            if result == "NOT_FOUND":
-                logger.debug("AI could not find profile text region")
-                return None
-            
-            # Parse coordinates
-            try:
-                x, y, w, h = map(int, result.split(','))
-                logger.debug(f"AI found profile text region at ({x}, {y}) with size {w}x{h}")
-                return (x, y, w, h)
-            except ValueError:
-                logger.error(f"Invalid coordinate format from AI: {result}")
-                return None
-            
-        except Exception as e:
-            logger.error(f"Error finding profile text region: {e}")
-            # Fallback to simple heuristic
-            try:
-                with Image.open(screenshot_path) as img:
-                    width, height = img.size
-                    return (0, height // 2, width, height // 2)
-            except:
-                return None
+    def _downscale_jpeg(self, image: Image.Image, size: Tuple[int, int]) -> bytes:
+        """Resize an RGB image to size with area averaging and encode it as JPEG"""
+        if cv2 is None:
+            # Resize a copy so the decoded frame stays intact for other detectors
+            small = image.resize(size, Image.Resampling.BOX, reducing_gap=3.0)
+            buffer = io.BytesIO()
+            small.save(buffer, format='JPEG', quality=VISION_JPEG_QUALITY, optimize=True)
+            return buffer.getvalue()
+        
+        shape = (size[1], size[0], 3)
+        if self._small_rgb is None or self._small_rgb.shape != shape:
+            self._small_rgb = np.empty(shape, dtype=np.uint8)
+            self._small_bgr = np.empty(shape, dtype=np.uint8)
+        rgb = np.asarray(image)
+        # Whole-factor area reduction takes OpenCV's fast path, leaving a small fractional step
+        factor = min(rgb.shape[1] // size[0], rgb.shape[0] // size[1])
+        if factor >= 2:
+            rgb = cv2.resize(rgb, (rgb.shape[1] // factor, rgb.shape[0] // factor), interpolation=cv2.INTER_AREA)
+        cv2.resize(rgb, size, dst=self._small_rgb, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small_rgb, cv2.COLOR_RGB2BGR, dst=self._small_bgr)
+        ok, jpeg = cv2.imencode('.jpg', self._small_bgr, [cv2.IMWRITE_JPEG_QUALITY, VISION_JPEG_QUALITY])
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        return jpeg.tobytes()
+    
+    def _image_size(self, frame: Frame) -> Tuple[int, int]:
+        """Read image dimensions from the PNG header, decoding only for other formats"""
+        header = frame.data[:24]
+        
+        # PNG signature, then the IHDR chunk holding width and height as big-endian uint32
+        if header[:8] == PNG_SIGNATURE and header[12:16] == b'IHDR':
+            return struct.unpack('>II', header[16:24])
+        
+        return frame.rgb.size
+    
+    def _fallback_button_position(self, width: int, height: int, button_type: str) -> Optional[Tuple[int, int]]:
+        """Heuristic button position for a screen of the given size"""
+        # Simple heuristic positioning based on common UI patterns
+        if button_type == 'like':
+            # Like button usually bottom right
+            return (int(width * 0.8), int(height * 0.9))
+        elif button_type == 'pass':
+            # Pass button usually bottom left
+            return (int(width * 0.2), int(height * 0.9))
+        elif button_type == 'comment':
+            # Comment button usually center bottom
+            return (int(width * 0.5), int(height * 0.9))
+        elif button_type == 'send':
+            # Send button usually bottom right
+            return (int(width * 0.8), int(height * 0.9))
+        elif button_type == 'text_input':
+            # Text input usually center bottom
+            return (int(width * 0.5), int(height * 0.85))
+        
+        return None
@@ -3,14 +3,8 @@
 HingeAutoBot - Quick Start Script
 """
 
-import sys
-import os
-from pathlib import Path
-
-# Add the app directory to Python path
-sys.path.insert(0, str(Path(__file__).parent / "app"))
-
-from main import main
+import runpy
 
 if __name__ == "__main__":
-    main()
+    # Run the app package's entry point, equivalent to `python -m app.main`
+    runpy.run_module("app.main", run_name="__main__", alter_sys=True)
@@ -0,0 +1,82 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+from app.profile_analyzer import ProfileAnalyzer
+
+
+class FakeCompletions:
+    """Chat completions stub returning queued replies and recording each request"""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        content = json.dumps(self.replies.pop(0))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def make_analyzer(tmp_path, replies):
+    """Build an analyzer without an API key whose client is a stub"""
+    analyzer = ProfileAnalyzer({'decision_cache_file': str(tmp_path / 'decisions.json')})
+    completions = FakeCompletions(replies)
+    analyzer.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return analyzer, completions
+
+
+def save_card(path, noise_pixel):
+    """Save a text-only prompt card; cards differing by one pixel hash as look-alikes"""
+    image = Image.new('RGB', (360, 800), (245, 240, 235))
+    image.putpixel(noise_pixel, (0, 0, 0))
+    image.save(path)
+    return str(path)
+
+
+@pytest.fixture
+def look_alike_cards(tmp_path):
+    return save_card(tmp_path / 'a.png', (10, 10)), save_card(tmp_path / 'b.png', (20, 20))
+
+
+def test_look_alike_frames_with_different_text_are_analyzed_separately(tmp_path, look_alike_cards):
+    analyzer, completions = make_analyzer(tmp_path, [
+        {'action': 'like', 'confidence': 0.9, 'reason': 'Loves hiking'},
+        {'action': 'pass', 'confidence': 0.8, 'reason': 'Smoker'},
+    ])
+    first_card, second_card = look_alike_cards
+
+    first = analyzer.analyze_profile("Alex, 27. I love hiking", first_card)
+    second = analyzer.analyze_profile("Sam, 31. Smoking is life", second_card)
+
+    assert len(completions.calls) == 2
+    assert (first.action, second.action) == ('like', 'pass')
+
+
+def test_look_alike_frame_with_same_text_reuses_decision(tmp_path, look_alike_cards):
+    analyzer, completions = make_analyzer(tmp_path, [
+        {'action': 'like', 'confidence': 0.9, 'reason': 'Loves hiking'},
+    ])
+    first_card, second_card = look_alike_cards
+
+    analyzer.analyze_profile("Alex, 27. I love hiking", first_card)
+    second = analyzer.analyze_profile("Alex, 27.  I love  hiking", second_card)
+
+    assert len(completions.calls) == 1
+    assert second.action == 'like'
+
+
+def test_comment_decisions_are_not_replayed_for_look_alike_frames(tmp_path, look_alike_cards):
+    analyzer, completions = make_analyzer(tmp_path, [
+        {'action': 'comment', 'confidence': 0.9, 'reason': 'Shared interest', 'comment': 'Which trail?'},
+        {'action': 'comment', 'confidence': 0.9, 'reason': 'Shared interest', 'comment': 'Favourite peak?'},
+    ])
+    first_card, second_card = look_alike_cards
+
+    analyzer.analyze_profile("Alex, 27. I love hiking", first_card)
+    second = analyzer.analyze_profile("Alex, 27. I love hiking", second_card)
+
+    assert len(completions.calls) == 2
+    assert second.comment == 'Favourite peak?'